@@ -0,0 +1,261 @@
+"""
+Headless batch mode: parses many archived G-code files in parallel and uploads
+them to the production inbox without opening a window.
+
+    python main.py --batch D:\\archivo\\2024 "D:\\otros\\*.gcode" --target quote --out resumen.json
+
+Prints (or writes with --out) a JSON summary with per-file stats, failures and
+throughput. Exit code is 0 when every file was parsed and uploaded, 1 otherwise.
+Uploads that fail transiently stay in the outbox and are retried by the app.
+
+    python main.py --watch \\\\NAS\\impresiones --target quote
+
+Watches folders instead and processes each new file once it stops changing.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, List, Optional
+from utils.logger import Logger
+from utils.metrics import metrics
+from utils.files import GCODE_EXTENSIONS
+
+DEFAULT_UPLOADS = 4 # Concurrent requests; matches the HTTP client's keep-alive pool
+
+
+def collect_files(inputs: Iterable[str], recursive: bool = True) -> List[str]:
+    """Expands directories and glob patterns into a sorted, de-duplicated list of G-code files."""
+    found = {}
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                paths = (os.path.join(root, name) for root, _, names in os.walk(item) for name in names)
+            else:
+                paths = (os.path.join(item, name) for name in os.listdir(item))
+        elif glob.has_magic(item):
+            paths = glob.iglob(item, recursive=True)
+        else:
+            paths = [item]
+        for path in paths:
+            if path.lower().endswith(GCODE_EXTENSIONS) and os.path.isfile(path):
+                found.setdefault(os.path.normcase(os.path.realpath(path)), path)
+    return sorted(found.values())
+
+
+class BatchRunner:
+    """
+    Pipelines parsing and uploading: files are parsed in the process pool and
+    each result is handed to a bounded pool of upload threads as soon as it is
+    ready, so the network is busy while the remaining files are still parsing.
+    """
+    def __init__(self, parse_pool, service, logger: Logger, version: str, target: str = 'product',
+                 product_id: Optional[str] = None, uploads: int = DEFAULT_UPLOADS, dry_run: bool = False,
+                 progress=None):
+        self.parse_pool = parse_pool
+        self.service = service
+        self.logger = logger
+        self.version = version
+        self.target = target
+        self.product_id = product_id if target == 'product' else None
+        self.uploads = max(1, uploads)
+        self.dry_run = dry_run
+        self.progress = progress # progress(done, total, result) after each file
+
+    def run(self, files: List[str]) -> dict:
+        started = time.perf_counter()
+        results = {path: {'path': path, 'size': self._size(path), 'ok': False} for path in files}
+        done = 0
+
+        with ThreadPoolExecutor(max_workers=self.uploads) as upload_pool:
+            parse_futures = {}
+            for path in files:
+                results[path]['parse_started'] = time.perf_counter()
+                parse_futures[self.parse_pool.submit(path)] = path
+
+            upload_futures = {}
+            for future in as_completed(parse_futures):
+                path = parse_futures[future]
+                result = results[path]
+                result['parse_ms'] = (time.perf_counter() - result.pop('parse_started')) * 1000
+                try:
+                    stats = future.result()
+                except Exception as e:
+                    result['error'] = f"parse: {e}"
+                else:
+                    result['stats'] = stats.to_dict()
+                    if not stats.time_minutes and not stats.grams:
+                        result['error'] = "parse: no se encontraron datos de tiempo ni peso"
+                    elif self.dry_run:
+                        result['ok'] = True
+                    else:
+                        upload_futures[upload_pool.submit(self._upload, path, stats)] = path
+                        continue
+                done += 1
+                self._report(done, len(files), result)
+
+            for future in as_completed(upload_futures):
+                result = results[upload_futures[future]]
+                result.update(future.result())
+                done += 1
+                self._report(done, len(files), result)
+
+        elapsed = time.perf_counter() - started
+        items = [results[path] for path in files]
+        total_bytes = sum(r['size'] for r in items)
+        failed = [r for r in items if not r['ok']]
+        return {
+            'files': items,
+            'summary': {
+                'total': len(items),
+                'ok': len(items) - len(failed),
+                'failed': len(failed),
+                'dry_run': self.dry_run,
+                'target': self.target,
+                'bytes': total_bytes,
+                'elapsed_s': elapsed,
+                'files_per_s': len(items) / elapsed if elapsed else 0.0,
+                'mb_per_s': total_bytes / 1e6 / elapsed if elapsed else 0.0,
+                'pending_uploads': 0 if self.dry_run else self.service.pending_count(),
+            },
+            'metrics': {name: {k: v for k, v in data.items() if k != 'samples'}
+                        for name, data in metrics.snapshot()['timers'].items()},
+        }
+
+    def _upload(self, path: str, stats) -> dict:
+        """Runs on an upload thread. Never raises: the error goes into the result."""
+        start = time.perf_counter()
+        name = os.path.basename(path)
+        try:
+            key, inbox_id = self.service.send_now(stats, name, self.product_id, name, self.version, target=self.target)
+            out = {'ok': True, 'key': key, 'inbox_id': inbox_id}
+        except Exception as e:
+            self.logger.error(f"Batch upload failed for {path}: {e}")
+            out = {'ok': False, 'error': f"upload: {e}"}
+        out['upload_ms'] = (time.perf_counter() - start) * 1000
+        return out
+
+    def _report(self, done: int, total: int, result: dict):
+        if self.progress:
+            self.progress(done, total, result)
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+
+def _print_progress(done: int, total: int, result: dict):
+    status = "OK" if result['ok'] else f"ERROR {result.get('error', '')}"
+    print(f"[{done}/{total}] {os.path.basename(result['path'])}: {status}", file=sys.stderr, flush=True)
+
+
+def run_batch(argv: List[str], logger: Optional[Logger] = None) -> int:
+    parser = argparse.ArgumentParser(prog="main.py --batch", description="Procesa y envía G-codes sin abrir la ventana.")
+    parser.add_argument('inputs', nargs='+', help="Archivos, carpetas o patrones glob (p. ej. 'archivo/**/*.gcode')")
+    parser.add_argument('--target', choices=('product', 'quote'), default='product')
+    parser.add_argument('--product-id', help="Producto al que vincular todos los archivos (solo con --target product)")
+    parser.add_argument('--jobs', type=int, default=None, help="Procesos de análisis en paralelo")
+    parser.add_argument('--uploads', type=int, default=DEFAULT_UPLOADS, help="Envíos simultáneos como máximo")
+    parser.add_argument('--no-recursive', action='store_true', help="No entrar en subcarpetas")
+    parser.add_argument('--dry-run', action='store_true', help="Solo analizar, sin enviar nada")
+    parser.add_argument('--out', help="Escribe el resumen JSON en este archivo en vez de la salida estándar")
+    parser.add_argument('--quiet', action='store_true', help="Sin progreso por stderr")
+    args = parser.parse_args(argv)
+
+    logger = logger or Logger()
+    files = collect_files(args.inputs, recursive=not args.no_recursive)
+    if not files:
+        print("No se encontraron archivos G-code.", file=sys.stderr)
+        return 1
+
+    from core.parser import GCodeParser
+    from core.parse_pool import ParsePool
+    from services.api import ProductionService
+    from config import VERSION
+
+    gcode_parser = GCodeParser(logger)
+    service = ProductionService(logger)
+    parse_pool = ParsePool(gcode_parser, logger, max_workers=args.jobs)
+    runner = BatchRunner(parse_pool, service, logger, VERSION, target=args.target, product_id=args.product_id,
+                         uploads=args.uploads, dry_run=args.dry_run,
+                         progress=None if args.quiet else _print_progress)
+    try:
+        report = runner.run(files)
+        if not args.dry_run:
+            service.thumbnails.flush(timeout=60) # Previews still uploading in the background
+    finally:
+        parse_pool.shutdown()
+        service.stop()
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    summary = report['summary']
+    logger.info(f"Batch finished: {summary['ok']}/{summary['total']} ok in {summary['elapsed_s']:.1f}s")
+    return 0 if not summary['failed'] else 1
+
+
+def run_watch(argv: List[str], logger: Optional[Logger] = None) -> int:
+    """
+    Headless watch-folder daemon: every file that appears (or changes) in the
+    folders is parsed and uploaded as soon as it stops changing. Prints one
+    JSON line per file. Runs until interrupted.
+    """
+    parser = argparse.ArgumentParser(prog="main.py --watch", description="Vigila carpetas y envía cada G-code nuevo.")
+    parser.add_argument('folders', nargs='+', help="Carpetas a vigilar (locales o de red)")
+    parser.add_argument('--target', choices=('product', 'quote'), default='quote')
+    parser.add_argument('--product-id', help="Producto al que vincular los archivos (solo con --target product)")
+    parser.add_argument('--jobs', type=int, default=None, help="Procesos de análisis en paralelo")
+    parser.add_argument('--uploads', type=int, default=DEFAULT_UPLOADS, help="Envíos simultáneos como máximo")
+    parser.add_argument('--recursive', action='store_true', help="Vigilar también las subcarpetas")
+    parser.add_argument('--interval', type=float, default=2.0, help="Segundos entre sondeos sin inotify")
+    parser.add_argument('--settle', type=float, default=2.0, help="Segundos sin cambios antes de leer un archivo")
+    parser.add_argument('--existing', action='store_true', help="Procesar también los archivos que ya había la primera vez")
+    args = parser.parse_args(argv)
+
+    logger = logger or Logger()
+    from core.parser import GCodeParser
+    from core.parse_pool import ParsePool
+    from services.api import ProductionService
+    from services.folder_watcher import FolderWatcher
+    from utils.paths import get_config_dir
+    from config import VERSION
+
+    gcode_parser = GCodeParser(logger)
+    service = ProductionService(logger)
+    service.start_background_sync() # Retries uploads that failed while offline
+    parse_pool = ParsePool(gcode_parser, logger, max_workers=args.jobs)
+    runner = BatchRunner(parse_pool, service, logger, VERSION, target=args.target,
+                         product_id=args.product_id, uploads=args.uploads)
+
+    def on_files(paths):
+        ingested = []
+        for item in runner.run(paths)['files']:
+            print(json.dumps(item, ensure_ascii=False), flush=True)
+            # A failed upload stays in the outbox (retried or parked there); only parse failures are retried here
+            if item['ok'] or item.get('error', '').startswith('upload:'):
+                ingested.append(item['path'])
+        return ingested
+
+    watcher = FolderWatcher(args.folders, on_files, logger,
+                            state_path=FolderWatcher.state_path_for(get_config_dir(), args.folders),
+                            interval=args.interval, settle=args.settle,
+                            recursive=args.recursive, ingest_existing=args.existing)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+        parse_pool.shutdown()
+        service.stop()
+    return 0
@@ -0,0 +1,240 @@
+"""
+Synthetic G-code generator for the benchmarks.
+
+Files imitate the header/footer comments of PrusaSlicer, OrcaSlicer and
+Bambu Studio, embed real PNG thumbnails and place tool changes at a
+configurable density, so results are reproducible without shipping
+multi-gigabyte sample files. Output is deterministic for a given seed.
+package() wraps a generated file as Prusa binary G-code or a sliced 3MF.
+"""
+import base64
+import random
+import struct
+import zipfile
+import zlib
+from dataclasses import dataclass
+
+STYLES = ('prusa', 'orca', 'bambu')
+CONTAINERS = ('gcode', 'bgcode', '3mf')
+
+
+@dataclass
+class Expected:
+    """What a correct parse of the generated file must return."""
+    grams: float
+    time_minutes: int
+    filament_type: str
+    multicolor_changes: int
+    thumbnails: int
+
+
+def _png(width: int, height: int, seed: int) -> bytes:
+    """Minimal valid RGB PNG (a gradient), built with the standard library only."""
+    rnd = random.Random(seed)
+    r0, g0 = rnd.randrange(256), rnd.randrange(256)
+    rows = b''.join(
+        b'\x00' + bytes(c for x in range(width) for c in ((r0 + x) & 255, (g0 + y) & 255, (x * y) & 255))
+        for y in range(height))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows, 6))
+            + chunk(b'IEND', b''))
+
+
+def _thumbnail_block(width: int, height: int, seed: int, tag: str = '') -> str:
+    b64 = base64.b64encode(_png(width, height, seed)).decode('ascii')
+    lines = [f"; {b64[i:i+78]}" for i in range(0, len(b64), 78)]
+    return (f";\n; thumbnail{tag} begin {width}x{height} {len(b64)}\n"
+            + "\n".join(lines) + f"\n; thumbnail{tag} end\n;\n")
+
+
+def _format_time(minutes: int) -> str:
+    h, m = divmod(minutes, 60)
+    return f"{h}h {m}m 0s" if h else f"{m}m 0s"
+
+
+def _header(style: str, layers: int, exp: Expected, seed: int) -> str:
+    thumbs = _thumbnail_block(16, 16, seed) + _thumbnail_block(220, 124, seed + 1)
+    if style == 'prusa':
+        return (f"; generated by PrusaSlicer 2.7.1+win64 on 2024-01-01 at 12:00:00 UTC\n\n"
+                f"{thumbs}\n"
+                f"M73 P0 R{exp.time_minutes}\nM201 X4000 Y4000 Z200 E2500\n")
+    if style == 'orca':
+        return (f"; HEADER_BLOCK_START\n; generated by OrcaSlicer 2.0.0 on 2024-01-01 at 12:00:00\n"
+                f"; total layer number: {layers}\n; HEADER_BLOCK_END\n\n"
+                f"; THUMBNAIL_BLOCK_START\n{thumbs}; THUMBNAIL_BLOCK_END\n\n")
+    return (f"; HEADER_BLOCK_START\n; BambuStudio 01.09.00.70\n"
+            # The parser keeps the first value on this line: the model printing time
+            f"; model printing time: {_format_time(exp.time_minutes)}; total estimated time: {_format_time(exp.time_minutes + 5)}\n"
+            f"; total layer number: {layers}\n"
+            f"; total filament length [mm] : {exp.grams * 330:.2f}\n"
+            f"; total filament weight [g] : {exp.grams:.2f}\n"
+            f"; filament_type = {exp.filament_type}\n"
+            f"; HEADER_BLOCK_END\n\n"
+            f"; THUMBNAIL_BLOCK_START\n{thumbs}; THUMBNAIL_BLOCK_END\n\n")
+
+
+def _footer(style: str, layers: int, exp: Expected) -> str:
+    changes = f"; total toolchanges = {exp.multicolor_changes}\n" if exp.multicolor_changes else ""
+    if style == 'prusa':
+        return (f"\n; filament used [mm] = {exp.grams * 330:.2f}\n"
+                f"; filament used [cm3] = {exp.grams / 1.24:.2f}\n"
+                f"; filament used [g] = {exp.grams:.2f}\n"
+                f"; filament cost = 0.00\n"
+                f"{changes}"
+                f"; estimated printing time (normal mode) = {_format_time(exp.time_minutes)}\n\n"
+                f"; prusaslicer_config = begin\n; filament_type = {exp.filament_type}\n"
+                f"; layer_height = 0.2\n; nozzle_diameter = 0.4\n; printer_model = MK4\n"
+                f"; prusaslicer_config = end\n")
+    if style == 'orca':
+        return (f"\n; filament used [mm] = {exp.grams * 330:.2f}\n"
+                f"; filament used [g] = {exp.grams:.2f}\n"
+                f"{changes}"
+                f"; estimated printing time (normal mode) = {_format_time(exp.time_minutes)}\n\n"
+                f"; CONFIG_BLOCK_START\n; filament_type = {exp.filament_type}\n"
+                f"; layer_height = 0.2\n; nozzle_diameter = 0.4\n; printer_model = Voron 2.4\n"
+                f"; CONFIG_BLOCK_END\n")
+    return (f"\n; CONFIG_BLOCK_START\n; filament_type = {exp.filament_type}\n"
+            f"; layer_height = 0.2\n; nozzle_diameter = 0.4\n; printer_model = Bambu Lab X1 Carbon\n"
+            f"{changes}"
+            f"; CONFIG_BLOCK_END\n")
+
+
+def _layer(style: str, z: float, rnd: random.Random, moves: int) -> str:
+    parts = [f";LAYER_CHANGE\n;Z:{z:.2f}\nG1 Z{z:.2f} F720\n;TYPE:Outer wall\n"]
+    x, y = 100.0, 100.0
+    for _ in range(moves):
+        x += rnd.uniform(-5, 5)
+        y += rnd.uniform(-5, 5)
+        parts.append(f"G1 X{x:.3f} Y{y:.3f} E{rnd.uniform(0.01, 0.2):.5f}\n")
+    return ''.join(parts)
+
+
+def _toolchange(style: str, tool: int) -> str:
+    if style == 'bambu':
+        return f"; CP TOOLCHANGE START\nM620 S{tool}A\nT{tool}\nM621 S{tool}A\n; CP TOOLCHANGE END\n"
+    return f"; CP TOOLCHANGE START\nT{tool}\n; CP TOOLCHANGE END\n"
+
+
+def generate(path: str, size_bytes: int, style: str = 'prusa', toolchange_every: int = 0,
+             summary: bool = True, seed: int = 1) -> Expected:
+    """
+    Writes a synthetic G-code file of roughly size_bytes to path.
+    toolchange_every: layers between tool changes (0 = single filament).
+    summary: write the slicer's toolchange total in the footer; without it
+    the parser has to count T commands across the whole body.
+    """
+    if style not in STYLES:
+        raise ValueError(f"Unknown style {style!r}, expected one of {STYLES}")
+    rnd = random.Random(seed)
+    multi = toolchange_every > 0
+
+    # Layers are generated once and reused, so even 2 GB files are written quickly
+    moves_per_layer = 400
+    templates = [_layer(style, 0.2, rnd, moves_per_layer) for _ in range(8)]
+    layer_bytes = sum(len(t) for t in templates) / len(templates)
+    layers = max(1, int(size_bytes / layer_bytes))
+
+    changes = (layers - 1) // toolchange_every if multi else 0
+    exp = Expected(
+        grams=round(5 + size_bytes / 1e6 * 0.8, 2),
+        time_minutes=30 + size_bytes // 200_000,
+        filament_type="PLA;PETG" if multi else "PLA",
+        multicolor_changes=changes,
+        thumbnails=2,
+    )
+    # Without a summary the parser counts T calls: changes + the initial T0 (T255 never counts)
+    footer_exp = Expected(exp.grams, exp.time_minutes, exp.filament_type,
+                          changes if summary else 0, exp.thumbnails)
+
+    with open(path, 'w', encoding='ascii', newline='\n') as f:
+        f.write(_header(style, layers, exp, seed))
+        if multi:
+            f.write("T0\n")
+        tool = 0
+        buf = []
+        for i in range(layers):
+            z = 0.2 * (i + 1)
+            buf.append(f";LAYER:{i}\n")
+            buf.append(templates[i % len(templates)].replace(";Z:0.20\nG1 Z0.20", f";Z:{z:.2f}\nG1 Z{z:.2f}", 1))
+            if multi and i + 1 < layers and (i + 1) % toolchange_every == 0:
+                tool = 1 - tool
+                buf.append(_toolchange(style, tool))
+            if len(buf) > 256:
+                f.write(''.join(buf))
+                buf = []
+        f.write(''.join(buf))
+        if multi:
+            f.write("T255\n")
+        f.write(_footer(style, layers, footer_exp))
+    return exp
+
+
+def _bgcode_block(block_type: int, data: bytes, params: bytes, compress: bool) -> bytes:
+    payload = zlib.compress(data, 6) if compress else data
+    header = struct.pack('<HHI', block_type, 1 if compress else 0, len(data))
+    if compress:
+        header += struct.pack('<I', len(payload))
+    body = header + params + payload
+    return body + struct.pack('<I', zlib.crc32(body))
+
+
+def _ini(entries) -> bytes:
+    return ''.join(f"{k}={v}\n" for k, v in entries).encode('ascii')
+
+
+def _write_bgcode(gcode_path: str, out_path: str, exp: Expected, seed: int, summary: bool):
+    """PrusaSlicer layout: file, printer, thumbnails, print, slicer metadata, then G-code blocks."""
+    with open(out_path, 'wb') as out:
+        out.write(struct.pack('<4sIH', b'GCDE', 1, 1))
+        out.write(_bgcode_block(0, _ini([('Producer', 'PrusaSlicer 2.7.1')]), b'\0\0', False))
+        out.write(_bgcode_block(3, _ini([
+            ('printer_model', 'MK4'), ('filament_type', exp.filament_type), ('nozzle_diameter', '0.4'),
+            ('filament used [g]', f"{exp.grams:.2f}"),
+            ('estimated printing time (normal mode)', _format_time(exp.time_minutes))]), b'\0\0', False))
+        for i, (w, h) in enumerate(((16, 16), (220, 124))):
+            out.write(_bgcode_block(5, _png(w, h, seed + i), struct.pack('<HHH', 0, w, h), False))
+        stats = [('filament used [mm]', f"{exp.grams * 330:.2f}"), ('filament used [g]', f"{exp.grams:.2f}"),
+                 ('estimated printing time (normal mode)', _format_time(exp.time_minutes))]
+        if summary and exp.multicolor_changes:
+            stats.append(('total toolchanges', exp.multicolor_changes))
+        out.write(_bgcode_block(4, _ini(stats), b'\0\0', False))
+        out.write(_bgcode_block(2, _ini([('filament_type', exp.filament_type), ('layer_height', '0.2')]), b'\0\0', True))
+        with open(gcode_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                out.write(_bgcode_block(1, chunk, b'\0\0', True))
+
+
+def _write_3mf(gcode_path: str, out_path: str, seed: int):
+    """Bambu-style sliced 3MF: plate G-code plus its PNG previews under Metadata/."""
+    with zipfile.ZipFile(out_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', '<?xml version="1.0" encoding="UTF-8"?><Types/>')
+        zf.writestr('3D/3dmodel.model', '<?xml version="1.0" encoding="UTF-8"?><model/>')
+        zf.write(gcode_path, 'Metadata/plate_1.gcode')
+        zf.writestr('Metadata/plate_1.png', _png(128, 128, seed + 10))
+        zf.writestr('Metadata/plate_1_small.png', _png(32, 32, seed + 11))
+
+
+def package(gcode_path: str, container: str, exp: Expected, seed: int = 1, summary: bool = True) -> tuple:
+    """
+    Wraps a generated file in another container and returns (path, expected).
+    bgcode: only the metadata blocks are parsed, so without a toolchange
+    summary no changes can be counted. 3mf: adds two PNG previews.
+    """
+    if container == 'gcode':
+        return gcode_path, exp
+    if container not in CONTAINERS:
+        raise ValueError(f"Unknown container {container!r}, expected one of {CONTAINERS}")
+    base = gcode_path[:-len('.gcode')] if gcode_path.endswith('.gcode') else gcode_path
+    if container == 'bgcode':
+        out_path = base + '.bgcode'
+        _write_bgcode(gcode_path, out_path, exp, seed, summary)
+        changes = exp.multicolor_changes if summary else 0
+        return out_path, Expected(exp.grams, exp.time_minutes, exp.filament_type, changes, 2)
+    out_path = base + '.gcode.3mf'
+    _write_3mf(gcode_path, out_path, seed)
+    return out_path, Expected(exp.grams, exp.time_minutes, exp.filament_type, exp.multicolor_changes, exp.thumbnails + 2)
@@ -0,0 +1,306 @@
+"""
+Benchmark harness for the desktop app.
+
+Usage (from desktop_app/):
+    python -m benchmarks.run --sizes 1MB,50MB,500MB --out bench.json
+    python -m benchmarks.run --compare old.json new.json
+
+Every case runs in a fresh process (so peak RSS belongs to that case alone)
+with its own temporary config dir, so user patterns and caches are never
+touched. Results are written as JSON together with the git commit and
+platform for comparisons across commits.
+"""
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DESKTOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if DESKTOP_DIR not in sys.path:
+    sys.path.insert(0, DESKTOP_DIR)
+
+from benchmarks.gcode_gen import CONTAINERS, STYLES, generate, package
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    for suffix, mult in (('GB', 1024 ** 3), ('MB', 1024 ** 2), ('KB', 1024)):
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * mult)
+    return int(text)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        # Windows: PROCESS_MEMORY_COUNTERS.PeakWorkingSetSize
+        import ctypes
+        from ctypes import wintypes
+
+        class PMC(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+        pmc = PMC()
+        pmc.cb = ctypes.sizeof(PMC)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(pmc), pmc.cb)
+        return pmc.PeakWorkingSetSize / 1024 / 1024
+
+
+def latency_stats(samples) -> dict:
+    ordered = sorted(samples)
+
+    def pct(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        'runs': len(ordered),
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+        'min_ms': ordered[0] * 1000,
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+def _timed_runs(fn, repeat: int):
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+
+# --- Cases (each runs in its own process) -----------------------------------
+
+def _case_parse(path: str, expected: dict, repeat: int, cached: bool) -> dict:
+    from utils.logger import Logger
+    from core.parser import GCodeParser
+    parser = GCodeParser(Logger("ERROR"))
+    parser.use_cache = cached
+    if cached:
+        parser.parse_file(path) # Warm the cache
+    samples, stats = _timed_runs(lambda: parser.parse_file(path), repeat)
+
+    got = {'grams': stats.grams, 'time_minutes': stats.time_minutes, 'filament_type': stats.filament_type,
+           'multicolor_changes': stats.multicolor_changes, 'thumbnails': len(stats.thumbnails)}
+    mismatches = {k: {'expected': expected[k], 'got': got[k]} for k in got if got[k] != expected[k]}
+    size = os.path.getsize(path)
+    return dict(latency_stats(samples), mb_per_s=size / 1024 / 1024 / statistics.median(samples),
+                correct=not mismatches, mismatches=mismatches)
+
+
+def _case_scan_candidates(path: str, repeat: int) -> dict:
+    from utils.logger import Logger
+    from core.parser import GCodeParser
+    parser = GCodeParser(Logger("ERROR"))
+    samples, candidates = _timed_runs(lambda: parser.scan_candidates(path), repeat)
+    size = os.path.getsize(path)
+    return dict(latency_stats(samples), mb_per_s=size / 1024 / 1024 / statistics.median(samples),
+                candidates={k: len(v) for k, v in candidates.items()})
+
+
+def _case_learn_pattern(path: str, repeat: int) -> dict:
+    from utils.logger import Logger
+    from core.parser import GCodeParser
+    parser = GCodeParser(Logger("ERROR"))
+    line = "; filament used [g] = 12.34"
+    samples, result = _timed_runs(lambda: parser.learn_pattern('filament_grams', line), repeat)
+    # Learning recompiles the bundle and changes the cache key: measure the next parse too
+    parse_samples, _ = _timed_runs(lambda: parser.parse_file(path), 1)
+    return dict(latency_stats(samples), ok=bool(result[0]), first_parse_after_ms=parse_samples[0] * 1000)
+
+
+class _HookHandler(BaseHTTPRequestHandler):
+    """Local stand-in for /api/production/slicer-hook: validates, gunzips and answers with an id."""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True # Headers and body are separate writes; avoid delayed-ACK stalls
+    counter = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Content-Encoding', '').lower() == 'gzip':
+            body = gzip.decompress(body)
+        data = json.loads(body)
+        type(self).counter += 1
+        out = json.dumps({'success': True, 'id': data.get('idempotencyKey') or str(self.counter)}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+def _case_slicer_hook(path: str, repeat: int) -> dict:
+    from utils.logger import Logger
+    from core.parser import GCodeParser
+    from services.http_client import HttpClient
+    stats = GCodeParser(Logger("ERROR")).parse_file(path)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _HookHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/production/slicer-hook"
+    client = HttpClient(Logger("ERROR"))
+    payload = dict(stats.to_dict(), name="bench", fileName=os.path.basename(path), scriptVersion="bench", target="quote")
+    try:
+        samples, _ = _timed_runs(lambda: client.post_json(url, dict(payload, idempotencyKey=str(time.time_ns())),
+                                                          idempotent=True), repeat)
+    finally:
+        client.close()
+        server.shutdown()
+    return latency_stats(samples)
+
+
+CASES = {
+    'parse_cold': lambda f, exp, r: _case_parse(f, exp, r, cached=False),
+    'parse_cached': lambda f, exp, r: _case_parse(f, exp, r, cached=True),
+    'scan_candidates': lambda f, exp, r: _case_scan_candidates(f, r),
+    'learn_pattern': lambda f, exp, r: _case_learn_pattern(f, r),
+    'slicer_hook': lambda f, exp, r: _case_slicer_hook(f, r * 10),
+}
+
+
+def _run_case(name: str, path: str, expected: dict, repeat: int, config_dir: str) -> dict:
+    """Child process entry point."""
+    os.environ['APPDATA'] = config_dir # get_config_dir() -> isolated patterns/caches
+    result = CASES[name](path, expected, repeat)
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=DESKTOP_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run(args) -> dict:
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix='ddreams_bench_', dir=args.workdir)
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    try:
+        for style in args.styles:
+            for size in args.sizes:
+                gcode_path = os.path.join(workdir, f"{style}_{size}.gcode")
+                start = time.perf_counter()
+                gcode_expected = generate(gcode_path, size, style, args.toolchange_every, summary=not args.no_summary, seed=args.seed)
+                gen_s = time.perf_counter() - start
+                print(f"[{style} {os.path.getsize(gcode_path)/1024/1024:.0f} MB] generated in {gen_s:.1f}s")
+
+                for container in args.containers:
+                    path, expected = package(gcode_path, container, gcode_expected, seed=args.seed, summary=not args.no_summary)
+                    actual = os.path.getsize(path)
+                    if container != 'gcode':
+                        print(f" [{container} {actual/1024/1024:.1f} MB]")
+                    for case in args.cases:
+                        config_dir = tempfile.mkdtemp(dir=workdir)
+                        with ctx.Pool(1) as pool:
+                            result = pool.apply(_run_case, (case, path, expected.__dict__, args.repeat, config_dir))
+                        shutil.rmtree(config_dir, ignore_errors=True)
+                        result.update(case=case, style=style, container=container, size_bytes=actual,
+                                      toolchange_every=args.toolchange_every, summary=not args.no_summary)
+                        results.append(result)
+                        extra = f" {result['mb_per_s']:.0f} MB/s" if 'mb_per_s' in result else ""
+                        flag = "" if result.get('correct', True) else f" MISMATCH {result['mismatches']}"
+                        print(f"  {case:<16} p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms"
+                              f"{extra}  rss {result['peak_rss_mb']:.0f} MB{flag}")
+                    if path != gcode_path:
+                        os.remove(path)
+                os.remove(gcode_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+
+def compare(old_path: str, new_path: str):
+    """Prints p50 and throughput changes between two result files."""
+    def load(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data['meta'], {(r['case'], r['style'], r.get('container', 'gcode'), r['size_bytes'], r['toolchange_every']): r for r in data['results']}
+
+    old_meta, old = load(old_path)
+    new_meta, new = load(new_path)
+    print(f"{old_meta.get('commit') or old_path} -> {new_meta.get('commit') or new_path}")
+    for key in sorted(set(old) & set(new)):
+        a, b = old[key], new[key]
+        delta = (b['p50_ms'] - a['p50_ms']) / a['p50_ms'] * 100 if a['p50_ms'] else 0.0
+        case, style, container, size, _ = key
+        print(f"  {case:<16} {style:<6} {container:<6} {size/1024/1024:8.0f} MB  p50 {a['p50_ms']:9.2f} -> {b['p50_ms']:9.2f} ms ({delta:+.1f}%)"
+              f"  rss {a['peak_rss_mb']:.0f} -> {b['peak_rss_mb']:.0f} MB")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="DDreams desktop benchmarks")
+    ap.add_argument('--sizes', default='1MB,50MB', help="Comma-separated file sizes (e.g. 1MB,500MB,2GB)")
+    ap.add_argument('--styles', default=','.join(STYLES), help="Slicer styles: prusa,orca,bambu")
+    ap.add_argument('--containers', default='gcode', help=f"File formats: {','.join(CONTAINERS)}")
+    ap.add_argument('--cases', default=','.join(CASES), help=f"Cases to run: {','.join(CASES)}")
+    ap.add_argument('--toolchange-every', type=int, default=5, help="Layers between tool changes (0 = single filament)")
+    ap.add_argument('--no-summary', action='store_true', help="Omit the toolchange total (forces a full-body count)")
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--workdir', default=None, help="Where generated files go (default: system temp)")
+    ap.add_argument('--out', default=None, help="Write results as JSON here")
+    ap.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="Compare two result files and exit")
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    args.sizes = [parse_size(s) for s in args.sizes.split(',') if s]
+    args.styles = [s for s in args.styles.split(',') if s]
+    args.cases = [c for c in args.cases.split(',') if c]
+    args.containers = [c for c in args.containers.split(',') if c]
+    unknown = [c for c in args.cases if c not in CASES]
+    if unknown:
+        ap.error(f"Unknown cases: {unknown}")
+
+    report = run(args)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -21,11 +21,41 @@ else:
 API_BASE = f"{WEB_URL}/api/production"
 API_URL = f"{API_BASE}/slicer-hook"
 API_PRODUCTS_URL = f"{API_BASE}/products-list"
+API_BATCH_URL = f"{API_URL}/batch"
+API_THUMBNAILS_URL = f"{API_BASE}/thumbnails"
 
 # Machine Link
 # Pega aquí el ID de la máquina de la web (ej: "123-abc-...")
 # Si se deja vacío, la web intentará adivinar por el nombre del modelo.
 MACHINE_ID = ""
 
+# HTTP client (seconds / attempts)
+API_TIMEOUT_PRODUCTS = 5
+API_TIMEOUT_SEND = 10
+API_MAX_RETRIES = 3
+API_BATCH_MAX_PLATES = 50 # Plates per multi-plate request; larger sessions are split
+THUMBNAIL_UPLOAD_SIZE = (300, 300) # Preview uploaded to the web inbox (smallest embedded image covering it)
+
+# Log files (~/ddreams_debug.txt, ~/ddreams_error.log): DEBUG, INFO or ERROR
+LOG_LEVEL = "DEBUG"
+
+# Parse diagnostics (head/tail samples, matched spans, stage timings of recent parses).
+# Off by default: parsing then does no extra I/O. Can also be toggled from the UI.
+DIAGNOSTICS_ENABLED = False
+
+# Time-to-first-window budget (seconds), measured from the slicer calling the launcher
+STARTUP_BUDGET = 1.5
+
+# Product list snapshot: reused without asking the server for this many seconds
+PRODUCTS_CACHE_TTL = 600
+
+# Watch folders: G-code exported here (network share, SD card copies...) is added
+# automatically once the file stops changing. Empty = off.
+# Ej: WATCH_FOLDERS = [r"\\NAS\impresiones", r"C:\Users\Taller\Exportados"]
+WATCH_FOLDERS = []
+WATCH_RECURSIVE = False
+WATCH_INTERVAL = 2.0 # Seconds between scans when inotify is not available
+WATCH_SETTLE = 2.0   # Seconds a file must stay unchanged before it is read
+
 SECRET_TOKEN = "tu_secreto_super_seguro" 
 VERSION = "13.3-Cloud"
@@ -0,0 +1,75 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class ParseCapture:
+    """Everything recorded about one parse while diagnostics are on."""
+    path: str
+    started_at: float
+    size: int = 0
+    mode: str = ""         # cache, metadata, mmap or stream
+    head: str = ""         # first sample_bytes of the file
+    tail: str = ""         # last sample_bytes of the file
+    matches: List[dict] = field(default_factory=list)  # {kind, key, value, start, end} (file offsets)
+    timings: Dict[str, float] = field(default_factory=dict)  # stage -> seconds
+
+    def add_timing(self, stage: str, seconds: float):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def add_match(self, kind: str, key: str, value: Optional[str], start: int, end: int):
+        self.matches.append({'kind': kind, 'key': key, 'value': value, 'start': start, 'end': end})
+
+    def summary(self) -> str:
+        total = sum(self.timings.values())
+        stages = ", ".join(f"{k} {v*1000:.1f}ms" for k, v in self.timings.items())
+        return f"{os.path.basename(self.path)} [{self.mode}] {self.size/1e6:.1f} MB, {len(self.matches)} campos, {total*1000:.1f}ms ({stages})"
+
+
+class Diagnostics:
+    """
+    Opt-in parse diagnostics. While disabled, begin() returns None and the
+    parser does no extra work or I/O. While enabled, the most recent captures
+    are kept in memory (bounded ring) and can be exported as JSON on request.
+    """
+    def __init__(self, enabled: bool = False, capacity: int = 20, sample_bytes: int = 5000):
+        self.enabled = enabled
+        self.sample_bytes = sample_bytes
+        self._ring = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def begin(self, path: str) -> Optional[ParseCapture]:
+        if not self.enabled:
+            return None
+        return ParseCapture(path=path, started_at=time.time())
+
+    def sample(self, capture: ParseCapture, f, size: int):
+        """Reads the head/tail samples (only called while capturing)."""
+        capture.size = size
+        pos = f.tell()
+        f.seek(0)
+        capture.head = f.read(self.sample_bytes).decode('utf-8', errors='ignore')
+        f.seek(max(0, size - self.sample_bytes))
+        capture.tail = f.read(self.sample_bytes).decode('utf-8', errors='ignore')
+        f.seek(pos)
+
+    def add(self, capture: ParseCapture):
+        with self._lock:
+            self._ring.append(capture)
+
+    def recent(self) -> List[ParseCapture]:
+        with self._lock:
+            return list(self._ring)
+
+    def clear(self):
+        with self._lock:
+            self._ring.clear()
+
+    def export(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([asdict(c) for c in self.recent()], f, indent=2, ensure_ascii=False)
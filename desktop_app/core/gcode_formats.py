@@ -0,0 +1,204 @@
+"""
+Containers slicers export G-code in, and readers that reach the metadata
+without unpacking the whole file:
+
+- Plain text G-code (.gcode).
+- Prusa binary G-code (.bgcode): a sequence of blocks. Metadata and thumbnail
+  blocks come first and are read directly; reading stops at the first
+  (heatshrink/meatpack compressed) G-code block.
+- 3MF projects with sliced plates (.gcode.3mf, Bambu Studio / OrcaSlicer): a zip
+  whose Metadata/plate_N.gcode members are read as decompressing streams,
+  never extracted to disk.
+"""
+import io
+import re
+import struct
+import zipfile
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+from domain.models import ThumbnailRef
+from utils.logger import Logger
+
+FORMAT_GCODE = 'gcode'
+FORMAT_BGCODE = 'bgcode'
+FORMAT_3MF = '3mf'
+
+BGCODE_MAGIC = b'GCDE'
+ZIP_MAGIC = b'PK\x03\x04'
+
+# bgcode layout (little endian): file header, then blocks of
+#   header (type, compression, uncompressed size[, compressed size]) + parameters + data [+ CRC32]
+BGCODE_FILE_HEADER = struct.Struct('<4sIH')   # magic, version, checksum type
+BGCODE_BLOCK_HEADER = struct.Struct('<HHI')   # type, compression, uncompressed size
+BGCODE_THUMBNAIL_PARAMS = struct.Struct('<HHH')  # format, width, height
+BGCODE_CHECKSUM_CRC32 = 1
+
+BLOCK_FILE_METADATA = 0
+BLOCK_GCODE = 1
+BLOCK_SLICER_METADATA = 2
+BLOCK_PRINTER_METADATA = 3
+BLOCK_PRINT_METADATA = 4
+BLOCK_THUMBNAIL = 5
+METADATA_BLOCKS = (BLOCK_FILE_METADATA, BLOCK_PRINTER_METADATA, BLOCK_PRINT_METADATA, BLOCK_SLICER_METADATA)
+
+COMPRESSION_NONE = 0
+COMPRESSION_DEFLATE = 1 # Heatshrink (2, 3) is only used for G-code blocks
+
+BGCODE_THUMBNAIL_FORMATS = {0: 'PNG', 1: 'JPG', 2: 'QOI'}
+
+PLATE_GCODE_RE = re.compile(r'(?:^|/)plate_(\d+)\.gcode$', re.IGNORECASE)
+
+
+@dataclass
+class BgcodeBlock:
+    type: int
+    compression: int
+    offset: int  # File offset of the (possibly compressed) data
+    size: int    # Stored size of the data
+    uncompressed_size: int
+    params: bytes
+
+
+def detect_format(f: BinaryIO) -> str:
+    """Identifies the container from its magic bytes. Leaves the stream at offset 0."""
+    f.seek(0)
+    magic = f.read(4)
+    f.seek(0)
+    if magic == BGCODE_MAGIC:
+        return FORMAT_BGCODE
+    if magic == ZIP_MAGIC:
+        return FORMAT_3MF
+    return FORMAT_GCODE
+
+
+def iter_bgcode_blocks(f: BinaryIO) -> Iterator[BgcodeBlock]:
+    """
+    Walks the block headers up to the first G-code block: PrusaSlicer writes
+    every metadata and thumbnail block before the G-code, so the (large)
+    compressed body is never seeked over.
+    """
+    f.seek(0)
+    magic, _version, checksum = BGCODE_FILE_HEADER.unpack(f.read(BGCODE_FILE_HEADER.size))
+    if magic != BGCODE_MAGIC:
+        raise ValueError("Not a binary G-code file")
+    checksum_size = 4 if checksum == BGCODE_CHECKSUM_CRC32 else 0
+
+    while True:
+        header = f.read(BGCODE_BLOCK_HEADER.size)
+        if len(header) < BGCODE_BLOCK_HEADER.size:
+            return
+        block_type, compression, uncompressed_size = BGCODE_BLOCK_HEADER.unpack(header)
+        if block_type == BLOCK_GCODE:
+            return
+        size = uncompressed_size
+        if compression != COMPRESSION_NONE:
+            (size,) = struct.unpack('<I', f.read(4))
+        params = f.read(BGCODE_THUMBNAIL_PARAMS.size if block_type == BLOCK_THUMBNAIL else 2)
+        offset = f.tell()
+        yield BgcodeBlock(block_type, compression, offset, size, uncompressed_size, params)
+        f.seek(offset + size + checksum_size)
+
+
+def read_bgcode_block(f: BinaryIO, block: BgcodeBlock) -> bytes:
+    f.seek(block.offset)
+    data = f.read(block.size)
+    if block.compression == COMPRESSION_NONE:
+        return data
+    if block.compression == COMPRESSION_DEFLATE:
+        return zlib.decompress(data)
+    raise ValueError(f"Unsupported compression {block.compression} in block type {block.type}")
+
+
+def read_bgcode_header(f: BinaryIO, logger: Optional[Logger] = None) -> Tuple[List[Tuple[int, bytes]], List[ThumbnailRef]]:
+    """
+    One walk over the blocks before the G-code. Returns the metadata as
+    (block offset, line) pairs, each entry rewritten as the "; key = value"
+    comment a text export would contain so the same patterns apply to both
+    formats, plus the thumbnail refs. A metadata block that cannot be decoded
+    (e.g. heatshrink compressed) is skipped; the others are still read.
+    """
+    metadata, thumbnails = [], []
+    for block in iter_bgcode_blocks(f):
+        if block.type == BLOCK_THUMBNAIL:
+            if block.compression == COMPRESSION_NONE:
+                fmt, width, height = BGCODE_THUMBNAIL_PARAMS.unpack(block.params)
+                thumbnails.append(ThumbnailRef(width=width, height=height, offset=block.offset, length=block.size,
+                                               fmt=BGCODE_THUMBNAIL_FORMATS.get(fmt, 'PNG'), encoding='raw'))
+        elif block.type in METADATA_BLOCKS:
+            metadata.append(block)
+
+    lines = []
+    for block in metadata:
+        try:
+            data = read_bgcode_block(f, block)
+        except (ValueError, zlib.error) as e:
+            if logger:
+                logger.debug(f"Skipping bgcode metadata block at {block.offset}: {e}")
+            continue
+        for raw in data.splitlines():
+            key, sep, value = raw.partition(b'=')
+            if sep:
+                lines.append((block.offset, b'; ' + key.strip() + b' = ' + value.strip()))
+    return lines, thumbnails
+
+
+def plate_members(zf: zipfile.ZipFile) -> List[str]:
+    """Sliced G-code members of a 3MF, in plate order."""
+    names = [n for n in zf.namelist() if n.lower().endswith('.gcode')]
+    def plate_number(name):
+        m = PLATE_GCODE_RE.search(name)
+        return (int(m.group(1)) if m else 0, name)
+    return sorted(names, key=plate_number)
+
+
+def plate_thumbnails(zf: zipfile.ZipFile, member: str) -> List[ThumbnailRef]:
+    """PNG previews stored next to a plate's G-code (Metadata/plate_1.png, plate_1_small.png)."""
+    stem = member[:-len('.gcode')]
+    refs = []
+    for name in (f"{stem}.png", f"{stem}_small.png"):
+        try:
+            info = zf.getinfo(name)
+        except KeyError:
+            continue
+        with zf.open(info) as png:
+            size = png_size(png.read(24))
+        if size:
+            refs.append(ThumbnailRef(width=size[0], height=size[1], offset=0, length=info.file_size,
+                                     fmt='PNG', encoding='raw', member=name))
+    return refs
+
+
+def png_size(head: bytes) -> Optional[Tuple[int, int]]:
+    """Width and height from a PNG's IHDR chunk (first 24 bytes)."""
+    if len(head) < 24 or head[:8] != b'\x89PNG\r\n\x1a\n' or head[12:16] != b'IHDR':
+        return None
+    return struct.unpack('>II', head[16:24])
+
+
+@contextmanager
+def open_gcode_text(f: BinaryIO) -> Iterator[Tuple[BinaryIO, int]]:
+    """
+    Wraps an open file of any supported format as a binary stream of G-code
+    text and yields (stream, size). For .bgcode the stream holds the metadata
+    as comments (the G-code body stays compressed); for 3MF it is the first
+    plate's member.
+    """
+    fmt = detect_format(f)
+    if fmt == FORMAT_BGCODE:
+        lines, _ = read_bgcode_header(f)
+        data = b''.join(line + b'\n' for _, line in lines)
+        yield io.BytesIO(data), len(data)
+    elif fmt == FORMAT_3MF:
+        with zipfile.ZipFile(f) as zf:
+            members = plate_members(zf)
+            if not members:
+                raise ValueError("El 3MF no contiene G-code laminado")
+            info = zf.getinfo(members[0])
+            with zf.open(info) as member:
+                yield member, info.file_size
+    else:
+        size = f.seek(0, io.SEEK_END)
+        f.seek(0)
+        yield f, size
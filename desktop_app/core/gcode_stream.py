@@ -0,0 +1,37 @@
+import re
+from typing import BinaryIO, Iterator, Pattern, Tuple
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# Lines the parser cares about: comments (metadata, thumbnails) and tool changes.
+# Plain motion lines (G0/G1/...) are skipped at C speed by the regex engine.
+SIGNIFICANT_LINE_RE = re.compile(rb'(?m)^(?:[ \t]*;[^\r\n]*|T\d+)')
+
+
+def iter_lines(f: BinaryIO, pattern: Pattern = SIGNIFICANT_LINE_RE,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[int, bytes]]:
+    """
+    Reads a binary stream in fixed-size chunks and yields (offset, line) for every
+    line matched by `pattern`. Only complete lines are scanned; the partial line at
+    the end of a chunk is carried over to the next one, so peak memory is one chunk
+    plus the longest line, regardless of file size.
+    """
+    offset = 0
+    tail = b""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        buf = tail + chunk if tail else chunk
+        cut = buf.rfind(b"\n") + 1
+        if cut == 0:
+            tail = buf  # No complete line yet
+            continue
+        for m in pattern.finditer(buf, 0, cut):
+            yield offset + m.start(), m.group()
+        offset += cut
+        tail = buf[cut:]
+
+    if tail:
+        for m in pattern.finditer(tail):
+            yield offset + m.start(), m.group()
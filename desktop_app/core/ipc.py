@@ -1,7 +1,62 @@
+import json
+import queue
+import selectors
 import socket
+import struct
 import threading
-import sys
 from utils.logger import Logger
+from utils.metrics import metrics
+
+# Wire format: 4-byte big-endian length + UTF-8 JSON object.
+#   request: {"id": n, "paths": [...], "options": {...}}
+#   ack:     {"id": n, "ok": true, "accepted": k}
+HEADER = struct.Struct('>I')
+MAX_FRAME = 1024 * 1024 # Anything larger is a legacy raw-path sender (see _Connection)
+
+
+class _Connection:
+    """Per-client buffers for the selector loop. A client may send many frames on one connection."""
+    def __init__(self, sock):
+        self.sock = sock
+        self.inbuf = bytearray()
+        self.outbuf = bytearray()
+        self.legacy = False # Old clients send the bare path and close
+
+    def frames(self):
+        """Yields the complete frames in the input buffer."""
+        while not self.legacy and len(self.inbuf) >= HEADER.size:
+            (length,) = HEADER.unpack_from(self.inbuf)
+            if length > MAX_FRAME:
+                # A raw path ("C:\...") decodes as a huge length: keep reading until EOF
+                self.legacy = True
+                return
+            if len(self.inbuf) < HEADER.size + length:
+                return
+            body = bytes(self.inbuf[HEADER.size:HEADER.size + length])
+            del self.inbuf[:HEADER.size + length]
+            yield body
+
+
+def encode_frame(obj) -> bytes:
+    body = json.dumps(obj).encode('utf-8')
+    return HEADER.pack(len(body)) + body
+
+
+def _recv_frame(sock) -> dict:
+    header = _recv_exact(sock, HEADER.size)
+    (length,) = HEADER.unpack(header)
+    return json.loads(_recv_exact(sock, length))
+
+
+def _recv_exact(sock, n: int) -> bytes:
+    data = bytearray()
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed before the reply was complete")
+        data += chunk
+    return bytes(data)
+
 
 class SingleInstanceManager:
     def __init__(self, port=65500, logger=None):
@@ -9,60 +64,166 @@ class SingleInstanceManager:
         self.logger = logger or Logger()
         self.server_socket = None
         self.running = False
+        self._selector = None
+        self._dispatch = queue.Queue()
 
     def is_main_instance(self):
         """
-        Tries to bind to the port. 
+        Tries to bind to the port.
         If successful, returns True (we are the main instance).
         If failed, returns False (another instance is running).
         """
         try:
             self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.server_socket.bind(('127.0.0.1', self.port))
-            self.server_socket.listen(5)
+            self.server_socket.listen(64) # Bursts of launchers (one per exported plate)
             return True
         except socket.error:
             return False
 
     def start_server(self, callback):
         """
-        Starts a thread to listen for incoming messages (file paths).
-        callback(message): function to call when message received.
+        Starts the IPC threads: one selector loop accepting and reading all
+        clients, and one dispatcher calling callback(path, options) for every
+        received path, in arrival order. A slow callback never blocks senders.
+        UI updates must be scheduled via root.after in the callback implementation.
         """
         self.running = True
-        thread = threading.Thread(target=self._server_loop, args=(callback,), daemon=True)
-        thread.start()
+        self.server_socket.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.server_socket, selectors.EVENT_READ, None)
+        threading.Thread(target=self._server_loop, daemon=True).start()
+        threading.Thread(target=self._dispatch_loop, args=(callback,), daemon=True).start()
 
-    def _server_loop(self, callback):
+    def _server_loop(self):
         self.logger.info(f"IPC Server listening on port {self.port}")
         while self.running:
             try:
-                client, addr = self.server_socket.accept()
-                data = client.recv(4096).decode('utf-8')
-                if data:
-                    self.logger.info(f"IPC Received: {data}")
-                    # Run callback in main thread if possible, but here we just call it.
-                    # UI updates must be scheduled via root.after in the callback implementation.
-                    callback(data)
-                client.close()
+                events = self._selector.select(timeout=0.5)
+            except (OSError, ValueError):
+                break # Selector closed by stop()
+            for key, mask in events:
+                try:
+                    if key.data is None:
+                        self._accept()
+                    elif mask & selectors.EVENT_READ:
+                        self._read(key.data)
+                    if key.data is not None and mask & selectors.EVENT_WRITE:
+                        self._flush(key.data)
+                except Exception as e:
+                    if self.running:
+                        self.logger.error(f"IPC Server error: {e}")
+                    if key.data is not None:
+                        self._close(key.data)
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.server_socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            client.setblocking(False)
+            self._selector.register(client, selectors.EVENT_READ, _Connection(client))
+
+    def _read(self, conn: _Connection):
+        try:
+            data = conn.sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        if data:
+            conn.inbuf += data
+            for body in conn.frames():
+                self._handle_frame(conn, body)
+            return
+
+        # EOF
+        if conn.legacy and conn.inbuf:
+            path = conn.inbuf.decode('utf-8', errors='replace').strip()
+            self.logger.info(f"IPC Received (legacy): {path}")
+            self._dispatch.put((path, {}))
+        self._close(conn)
+
+    def _handle_frame(self, conn: _Connection, body: bytes):
+        try:
+            msg = json.loads(body)
+            paths = [p for p in msg.get('paths', []) if isinstance(p, str) and p]
+            options = msg.get('options') or {}
+        except (ValueError, AttributeError) as e:
+            self._reply(conn, {'ok': False, 'error': f"Bad message: {e}"})
+            return
+
+        self.logger.info(f"IPC Received: {paths}")
+        for path in paths:
+            self._dispatch.put((path, options))
+        # Ack once queued: the dispatcher delivers everything in order
+        self._reply(conn, {'id': msg.get('id'), 'ok': True, 'accepted': len(paths)})
+
+    def _reply(self, conn: _Connection, obj):
+        conn.outbuf += encode_frame(obj)
+        self._flush(conn)
+
+    def _flush(self, conn: _Connection):
+        if conn.outbuf:
+            try:
+                sent = conn.sock.send(conn.outbuf)
+                del conn.outbuf[:sent]
+            except (BlockingIOError, InterruptedError):
+                pass
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if conn.outbuf else 0)
+        self._selector.modify(conn.sock, events, conn)
+
+    def _close(self, conn: _Connection):
+        try:
+            self._selector.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            conn.sock.close()
+        except OSError:
+            pass
+
+    def _dispatch_loop(self, callback):
+        while self.running:
+            item = self._dispatch.get()
+            if item is None:
+                break
+            path, options = item
+            metrics.count("ipc.paths")
+            try:
+                with metrics.timer("ipc.dispatch"):
+                    callback(path, options)
             except Exception as e:
-                if self.running:
-                    self.logger.error(f"IPC Server error: {e}")
+                self.logger.error(f"IPC callback error: {e}")
 
-    def send_to_main(self, message):
-        """Sends a message to the main instance."""
+    def send_to_main(self, paths, options=None, quiet=False, timeout=2.0):
+        """
+        Sends one or more paths to the main instance and waits for its ack.
+        quiet=True is for probing: no main instance is not an error.
+        """
+        if isinstance(paths, str):
+            paths = [paths]
         try:
-            client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            client.connect(('127.0.0.1', self.port))
-            client.sendall(message.encode('utf-8'))
-            client.close()
+            with socket.create_connection(('127.0.0.1', self.port), timeout=timeout) as client:
+                client.sendall(encode_frame({'id': 1, 'paths': list(paths), 'options': options or {}}))
+                reply = _recv_frame(client)
+            if not reply.get('ok') or reply.get('accepted') != len(paths):
+                self.logger.error(f"IPC message rejected: {reply}")
+                return False
             return True
         except Exception as e:
-            self.logger.error(f"IPC Client error: {e}")
+            if quiet:
+                self.logger.debug(f"No main instance: {e}")
+            else:
+                self.logger.error(f"IPC Client error: {e}")
             return False
 
     def stop(self):
         self.running = False
+        self._dispatch.put(None)
+        if self._selector:
+            try:
+                self._selector.close()
+            except Exception: pass
         if self.server_socket:
             try:
                 self.server_socket.close()
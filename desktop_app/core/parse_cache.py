@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict, fields
+from typing import Optional
+from domain.models import GCodeStats
+from utils.logger import Logger
+
+# Bump when the parser output changes so old entries stop matching
+CACHE_VERSION = 4
+
+FINGERPRINT_SAMPLE_BYTES = 64 * 1024  # Hashed from both the head and the tail
+
+
+class ParseCache:
+    """
+    On-disk cache of GCodeStats results, one JSON file per entry.
+    Entries are keyed by file size, mtime, a partial-content hash and a hash of
+    the active pattern set, so changing patterns invalidates them automatically.
+    Least recently used entries are evicted once the cache exceeds its caps.
+    """
+    def __init__(self, config_dir: str, logger: Logger, max_entries: int = 500, max_bytes: int = 64 * 1024 * 1024):
+        self.logger = logger
+        self.cache_dir = os.path.join(config_dir, 'parse_cache')
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key_for(self, file_path: str, patterns_hash: str) -> Optional[str]:
+        try:
+            st = os.stat(file_path)
+            h = hashlib.sha1()
+            h.update(f"{CACHE_VERSION}|{patterns_hash}|{st.st_size}|{st.st_mtime_ns}".encode('utf-8'))
+            with open(file_path, 'rb') as f:
+                h.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+                if st.st_size > FINGERPRINT_SAMPLE_BYTES:
+                    f.seek(max(FINGERPRINT_SAMPLE_BYTES, st.st_size - FINGERPRINT_SAMPLE_BYTES))
+                    h.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+            return h.hexdigest()
+        except Exception as e:
+            self.logger.error(f"Parse cache fingerprint failed: {e}")
+            return None
+
+    def get(self, key: str) -> Optional[GCodeStats]:
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.error(f"Parse cache read failed: {e}")
+            return None
+
+        try:
+            os.utime(path, None) # Mark as recently used
+        except OSError:
+            pass
+        known = {f.name for f in fields(GCodeStats)}
+        return GCodeStats(**{k: v for k, v in data.items() if k in known})
+
+    def put(self, key: str, stats: GCodeStats):
+        path = self._entry_path(key)
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(asdict(stats), f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self.logger.error(f"Parse cache write failed: {e}")
+            return
+        self._evict()
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _evict(self):
+        try:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.json'): continue
+                path = os.path.join(self.cache_dir, name)
+                st = os.stat(path)
+                entries.append((st.st_mtime, st.st_size, path))
+        except Exception as e:
+            self.logger.error(f"Parse cache eviction failed: {e}")
+            return
+
+        total = sum(e[1] for e in entries)
+        entries.sort() # Oldest (least recently used) first
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,94 @@
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+from domain.models import GCodeStats
+from core.diagnostics import ParseCapture
+from utils.logger import Logger
+from utils.metrics import metrics
+from core.parser import GCodeParser
+
+# One parser per worker thread: in a pool process that is one per process; on the
+# thread fallback concurrent tasks must not share patterns or the diagnostics ring
+_worker = threading.local()
+
+
+def _parse_in_worker(file_path: str, patterns: Dict[str, str], diagnostics: bool = False,
+                     parent_pid: int = 0) -> Tuple[GCodeStats, Optional[ParseCapture], Optional[dict]]:
+    """
+    Runs inside a pool worker. Each worker keeps one parser alive across tasks.
+    Returns the stats, the diagnostics capture of this parse (when on) and the
+    metrics recorded since the last task (None on the thread fallback, where
+    they already land in the UI process' registry).
+    """
+    parser = getattr(_worker, 'parser', None)
+    if parser is None:
+        parser = _worker.parser = GCodeParser(Logger())
+    # Always use the caller's patterns and diagnostics setting: both can change at runtime
+    parser.patterns = patterns
+    parser.diagnostics.enabled = diagnostics
+    stats = parser.parse_file(file_path)
+    captures = parser.diagnostics.recent()
+    parser.diagnostics.clear()
+
+    worker_metrics = None
+    if os.getpid() != parent_pid:
+        worker_metrics = metrics.snapshot()
+        metrics.reset()
+        # Pool processes exit through os._exit, skipping the atexit flush
+        parser.logger.flush()
+    return stats, (captures[-1] if captures else None), worker_metrics
+
+
+class ParsePool:
+    """
+    Parses plates in a background process pool so several files are parsed in
+    parallel and the UI thread never blocks. Falls back to a thread pool when
+    processes cannot be started.
+    """
+    def __init__(self, parser: GCodeParser, logger: Logger, max_workers: Optional[int] = None):
+        self.parser = parser
+        self.logger = logger
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.executor = None
+
+    def submit(self, file_path: str) -> Future:
+        """Returns a Future resolving to the GCodeStats of file_path."""
+        if self.executor is None:
+            self.executor = self._create_executor()
+        args = (_parse_in_worker, file_path, dict(self.parser.patterns), self.parser.diagnostics.enabled, os.getpid())
+        try:
+            inner = self.executor.submit(*args)
+        except BrokenProcessPool as e:
+            self.logger.error(f"Process pool broken, using threads: {e}")
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            inner = self.executor.submit(*args)
+
+        # Diagnostics and metrics recorded in the worker join the UI process' ones
+        outer = Future()
+        def relay(f):
+            try:
+                stats, capture, worker_metrics = f.result()
+            except BaseException as e:
+                outer.set_exception(e)
+                return
+            if capture is not None:
+                self.parser.diagnostics.add(capture)
+            if worker_metrics is not None:
+                metrics.merge(worker_metrics)
+            outer.set_result(stats)
+        inner.add_done_callback(relay)
+        return outer
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _create_executor(self):
+        try:
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        except Exception as e:
+            self.logger.error(f"Process pool unavailable, using threads: {e}")
+            return ThreadPoolExecutor(max_workers=self.max_workers)
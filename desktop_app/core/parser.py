@@ -1,64 +1,303 @@
+import io
+import mmap
 import os
 import re
 import time
-import base64
-from domain.models import GCodeStats
+from contextlib import contextmanager
+import zipfile
+from typing import Callable, List, Optional
+from domain.models import GCodeStats, ThumbnailRef
 from utils.logger import Logger
-from core.pattern_manager import PatternManager
+from core.pattern_manager import PatternManager, PatternBundle
+from core.gcode_stream import iter_lines
+from core.gcode_formats import (FORMAT_BGCODE, FORMAT_3MF, detect_format, read_bgcode_header,
+                                plate_members, plate_thumbnails, open_gcode_text)
+from core.parse_cache import ParseCache
+from core.diagnostics import Diagnostics, ParseCapture
+from utils.metrics import metrics
+from config import DIAGNOSTICS_ENABLED
+
+# "; thumbnail begin 300x300 1234" (PNG) and PrusaSlicer's "; thumbnail_JPG begin ..." / "; thumbnail_QOI begin ..."
+THUMB_BEGIN_RE = re.compile(rb'; thumbnail(?:_(\w+))? begin (\d+)x(\d+) \d+')
+THUMB_END_RE = re.compile(rb'; thumbnail(?:_\w+)? end')
+
+# Toolchange totals written by the slicers in their summary block
+# (PrusaSlicer: "; total toolchanges = N", OrcaSlicer/Bambu: "; total filament change = N")
+TOOLCHANGE_SUMMARY_RE = re.compile(
+    r";\s*(?:total toolchanges|total filament changes?|filament change times)\s*[:=]\s*(\d+)", re.IGNORECASE)
+
+# Bytes patterns for the memory-mapped full scan
+# Anchored on the literal "\nT" rather than (?m)^ so the regex engine can skip ahead
+TOOL_CALL_RE = re.compile(rb'\nT(?!255\b)\d')  # T255 = End script / Virtual
+FIRST_TOOL_CALL_RE = re.compile(rb'T(?!255\b)\d')
+THUMB_BLOCK_BEGIN_RE = re.compile(THUMB_BEGIN_RE.pattern + rb'\r?\n')
+TOOLCHANGE_SUMMARY_BYTES_RE = re.compile(TOOLCHANGE_SUMMARY_RE.pattern.encode('ascii'), re.IGNORECASE)
+
+# Metadata-only mode: slicers write their header block and thumbnails at the start
+# of the file and the stats/config block at the end.
+HEAD_SCAN_BYTES = 1024 * 1024  # 1 MB
+TAIL_SCAN_BYTES = 256 * 1024   # 256 KB
+MISSING_SCAN_CHUNK_BYTES = 1024 * 1024 # Read size when a stream cannot be memory-mapped (3MF members)
+
+# Calibration candidates: comment lines in the header/thumbnail region and the
+# stats/config blocks at the end (PrusaSlicer's config block alone is ~100 KB).
+CANDIDATE_HEAD_BYTES = 1024 * 1024  # 1 MB
+CANDIDATE_TAIL_BYTES = 512 * 1024   # 512 KB
+CANDIDATE_CHUNK_BYTES = 128 * 1024
+CANDIDATES_PER_KEY = 20
+COMMENT_LINE_RE = re.compile(rb'(?m)^[ \t]*;[^\r\n]*')
+# key -> groups of alternative words; a line matches when every group has a word in it
+CANDIDATE_RULES = (
+    ('time', (('time',),)),
+    ('filament_grams', (('gram', 'weight'),)),
+    ('printer_model', (('model',), ('printer',))),
+    ('filament_type', (('filament',), ('type',))),
+    ('total_layers', (('layer',), ('count', 'number'))),
+)
+
+
+class _StreamState:
+    """Values collected by the single streaming pass over a G-code file."""
+    def __init__(self, bundle: PatternBundle):
+        self.bundle = bundle
+        self.values = {}     # user pattern key -> first captured value
+        self.dd_values = {}  # ddreams key -> first captured value
+        self.pending = len(bundle.compiled) # fields not matched yet
+        self.tool_calls = 0
+        self.summary_changes = None  # toolchange total from the slicer summary, if any
+        self.full_scan = True        # False when only the head/tail regions were read
+        self.thumbnails = []     # ThumbnailRef for every complete embedded thumbnail
+        self.thumb_open = None   # begin-line match while inside a thumbnail block
+        self.thumb_start = None  # offset of the first payload line of the open block
+        self.capture = None      # ParseCapture when diagnostics are on
+
 
 class GCodeParser:
     def __init__(self, logger: Logger):
         self.logger = logger
         self.pattern_manager = PatternManager()
-        self.patterns = self.pattern_manager.patterns
-        self.dd_patterns = {
-            'quality_profile': r"; ddreams_layer_height\s*=\s*([^\n\r]*)",
-            'filament_type': r"; ddreams_filament_type\s*=\s*([^\n\r]*)",
-            'printer_model': r"; ddreams_printer_model\s*=\s*([^\n\r]*)",
-            'nozzle_diameter': r"; ddreams_nozzle\s*=\s*([^\n\r]*)"
-        }
-
-    def parse_file(self, file_path: str) -> GCodeStats:
-        """Parses a G-code file and returns statistics."""
-        stats = GCodeStats()
-        content = self._read_file_safe(file_path)
-        
-        # DEBUG: Dump content for inspection
+        self.dd_patterns = self.pattern_manager.ddreams_patterns
+        # Full scans run bytes patterns over a memory-mapped file when possible
+        self.use_mmap = True
+        self._missing_bundles = {} # (bundle fingerprint, missing keys) -> PatternBundle
+        self.cache = ParseCache(self.pattern_manager.config_dir, logger)
+        self.use_cache = True
+        self.diagnostics = Diagnostics(enabled=DIAGNOSTICS_ENABLED)
+
+    def parse_file(self, file_path: str, full_scan: bool = False) -> GCodeStats:
+        """Parses a G-code file and returns statistics.
+        By default only the header/footer regions are read; the whole body is
+        streamed only when required fields are missing there (or full_scan=True).
+        Results are cached on disk by file fingerprint and active pattern set.
+        """
+        with metrics.timer("parse.total"):
+            return self._parse_file(file_path, full_scan)
+
+    def _parse_file(self, file_path: str, full_scan: bool) -> GCodeStats:
+        capture = self.diagnostics.begin(file_path)
+        cache_key = None
+        if self.use_cache:
+            with self._timed(capture, 'cache_lookup'):
+                cache_key = self.cache.key_for(file_path, self._patterns_hash())
+                cached = self.cache.get(cache_key) if cache_key and not full_scan else None
+            if cached is not None:
+                metrics.count("parse.cache_hit")
+                self.logger.info(f"Parse cache hit: {file_path}")
+                # Same content may live at another path (e.g. a temp copy)
+                for ref in cached.thumbnails:
+                    ref.path = file_path
+                if capture:
+                    capture.mode = 'cache'
+                    self.diagnostics.add(capture)
+                return cached
+
+        stats = self._parse_uncached(file_path, full_scan, capture)
+        if capture:
+            self.diagnostics.add(capture)
+        if stats is None:
+            return GCodeStats()
+
+        if cache_key:
+            self.cache.put(cache_key, stats)
+        return stats
+
+    @property
+    def patterns(self) -> dict:
+        return self.pattern_manager.patterns
+
+    @patterns.setter
+    def patterns(self, patterns: dict):
+        self.pattern_manager.set_patterns(patterns)
+
+    def _patterns_hash(self) -> str:
+        return self.pattern_manager.bundle.fingerprint
+
+    def _parse_uncached(self, file_path: str, full_scan: bool, capture: Optional[ParseCapture] = None) -> Optional[GCodeStats]:
+        """Returns None when the file could not be read (so the result is not cached)."""
+        with self._timed(capture, 'read'):
+            f = self._open_file_safe(file_path)
+            if f is None:
+                return None
+            size = os.fstat(f.fileno()).st_size
+        metrics.count("parse.bytes", size)
+
+        with f:
+            if size == 0:
+                self.logger.error("Empty file content read")
+                return None
+            if capture:
+                self.diagnostics.sample(capture, f, size)
+
+            bundle = self.pattern_manager.bundle
+            fmt = detect_format(f)
+            if fmt == FORMAT_BGCODE:
+                try:
+                    with self._timed(capture, 'scan_bgcode'):
+                        state = self._scan_bgcode(f, bundle, capture)
+                except Exception as e:
+                    self.logger.error(f"Error reading binary G-code: {e}")
+                    return None
+                if capture:
+                    capture.mode = 'bgcode'
+                return self._stats_from_state(state, file_path, capture)
+            if fmt == FORMAT_3MF:
+                return self._parse_3mf(f, file_path, full_scan, bundle, capture)
+
+            state = self._scan_text(f, size, full_scan, bundle, capture)
+
+        if capture:
+            capture.mode = 'metadata' if not state.full_scan else ('stream' if 'scan_stream' in capture.timings else 'mmap')
+        return self._stats_from_state(state, file_path, capture)
+
+    def _scan_text(self, f, size: int, full_scan: bool, bundle: PatternBundle, capture: Optional[ParseCapture] = None) -> _StreamState:
+        """Plain G-code: head/tail regions when they suffice, otherwise a full mmap or streaming scan."""
+        state = None
+        if not full_scan and size > HEAD_SCAN_BYTES + TAIL_SCAN_BYTES:
+            try:
+                with self._timed(capture, 'scan_metadata'):
+                    state = self._scan_metadata(f, size, bundle, capture)
+                if not self._metadata_complete(state):
+                    self.logger.info("Header/footer metadata incomplete, falling back to full scan")
+                    metrics.count("parse.full_scan_fallback")
+                    state = None
+                    if capture:
+                        capture.matches.clear() # The full scan records them again
+                elif state.values.keys() < {key for kind, key in bundle.compiled if kind == 'user'}:
+                    # Configured fields outside the head/tail windows: look for just those in the body
+                    with self._timed(capture, 'scan_missing'):
+                        self._scan_missing_fields(f, size, state)
+            except Exception as e:
+                self.logger.error(f"Error scanning header/footer: {e}")
+                state = None
+
+        # Zip members are decompressing streams: nothing to map
+        if state is None and self.use_mmap and not isinstance(f, zipfile.ZipExtFile):
+            try:
+                with self._timed(capture, 'scan_mmap'):
+                    state = self._scan_mmap(f, bundle, capture)
+            except Exception as e:
+                self.logger.info(f"mmap scan unavailable ({e}), streaming instead")
+                state = None
+
+        if state is None:
+            # Single streaming pass feeding the line state machine
+            state = _StreamState(bundle)
+            state.capture = capture
+            try:
+                f.seek(0)
+                with self._timed(capture, 'scan_stream'):
+                    for offset, line in iter_lines(f):
+                        self._feed_line(state, line, offset)
+            except Exception as e:
+                self.logger.error(f"Error streaming G-code: {e}")
+
+        return state
+
+    def _scan_bgcode(self, f, bundle: PatternBundle, capture: Optional[ParseCapture] = None) -> _StreamState:
+        """
+        Binary G-code: feeds the metadata blocks to the state machine and indexes
+        the thumbnail blocks. The compressed G-code blocks are never read, so
+        tool changes are only known from the slicer's summary, if present.
+        """
+        state = _StreamState(bundle)
+        state.full_scan = False
+        state.capture = capture
+        lines, state.thumbnails = read_bgcode_header(f, self.logger)
+        for offset, line in lines:
+            self._feed_line(state, line, offset)
+        return state
+
+    def _parse_3mf(self, f, file_path: str, full_scan: bool, bundle: PatternBundle,
+                   capture: Optional[ParseCapture] = None) -> Optional[GCodeStats]:
+        """
+        3MF with sliced plates: every plate's G-code member is scanned as a
+        decompressing stream (seeks within a member decompress and discard,
+        nothing is extracted). Several plates are summed like a multi-plate session.
+        """
         try:
-            debug_dir = os.path.join(os.path.dirname(file_path), "debug_dumps")
-            os.makedirs(debug_dir, exist_ok=True)
-            dump_path = os.path.join(debug_dir, "last_read_dump.txt")
-            with open(dump_path, "w", encoding="utf-8") as f:
-                f.write(f"--- START DUMP {file_path} ---\n")
-                f.write(content[:5000]) # First 5000 chars
-                f.write("\n\n--- END START ---\n\n")
-                f.write(content[-5000:]) # Last 5000 chars
-                f.write("\n--- END DUMP ---\n")
-            self.logger.info(f"Debug dump saved to {dump_path}")
-        except Exception as e:
-            self.logger.error(f"Failed to save debug dump: {e}")
+            zf = zipfile.ZipFile(f)
+        except zipfile.BadZipFile as e:
+            self.logger.error(f"Invalid 3MF/zip file: {e}")
+            return None
+        plates = []
+        with zf:
+            members = plate_members(zf)
+            if not members:
+                self.logger.error("3MF without sliced G-code (export it as .gcode.3mf from the slicer)")
+                return None
+            for name in members:
+                info = zf.getinfo(name)
+                with self._timed(capture, 'scan_3mf'), zf.open(info) as member:
+                    state = self._scan_text(member, info.file_size, full_scan, bundle, capture)
+                for ref in state.thumbnails:
+                    ref.member = name
+                state.thumbnails.extend(plate_thumbnails(zf, name))
+                plates.append(self._stats_from_state(state, file_path, capture))
+        if capture:
+            capture.mode = '3mf'
+        return plates[0] if len(plates) == 1 else self._combine_plates(plates)
 
-        if not content:
-            self.logger.error("Empty file content read")
-            return stats
-        
+    def _combine_plates(self, plates: List[GCodeStats]) -> GCodeStats:
+        total = GCodeStats()
+        first = plates[0]
+        total.grams = round(sum(p.grams for p in plates), 2)
+        total.time_minutes = sum(p.time_minutes for p in plates)
+        total.filament_length_m = sum(p.filament_length_m for p in plates)
+        total.total_layers = sum(p.total_layers for p in plates)
+        total.multicolor_changes = sum(p.multicolor_changes for p in plates)
+        total.filament_type = ", ".join(dict.fromkeys(p.filament_type for p in plates if p.filament_type))
+        total.machine_type = first.machine_type
+        total.quality_profile = first.quality_profile
+        total.printer_model = first.printer_model
+        total.nozzle_diameter = first.nozzle_diameter
+        total.thumbnails = [ref for p in plates for ref in p.thumbnails]
+        return total
+
+    def _stats_from_state(self, state: _StreamState, file_path: str, capture: Optional[ParseCapture] = None) -> GCodeStats:
+        stats = GCodeStats()
         try:
             # 1. Regex Extraction
-            self._extract_regex_data(content, stats)
+            with self._timed(capture, 'extract_regex'):
+                self._apply_regex_data(state.values, stats)
         except Exception as e:
             self.logger.error(f"Error extracting regex data: {e}")
             
         try:
             # 2. DDREAMS Block (Override)
-            self._extract_ddreams_data(content, stats)
+            with self._timed(capture, 'extract_ddreams'):
+                self._apply_ddreams_data(state.dd_values, stats)
         except Exception as e:
             self.logger.error(f"Error extracting DDREAMS data: {e}")
         
         try:
             # 3. Complex Logic (Time, Multicolor, Thumbnail)
-            self._calculate_time(content, stats)
-            self._count_color_changes(content, stats)
-            self._extract_thumbnail(content, stats)
+            with self._timed(capture, 'calculate_time'):
+                self._calculate_time(state.values.get('time'), stats)
+            with self._timed(capture, 'count_color_changes'):
+                self._count_color_changes(state, stats)
+            for ref in state.thumbnails:
+                ref.path = file_path
+            stats.thumbnails = state.thumbnails
         except Exception as e:
             self.logger.error(f"Error in complex logic extraction: {e}")
         
@@ -68,41 +307,209 @@ class GCodeParser:
 
         return stats
 
-    def _read_file_safe(self, path: str, retries=3) -> str:
+    @staticmethod
+    @contextmanager
+    def _timed(capture: Optional[ParseCapture], stage: str):
+        """Times a parse stage into the metrics registry (and the capture, if any)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.record(f"parse.{stage}", elapsed)
+            if capture:
+                capture.add_timing(stage, elapsed)
+
+    def _scan_metadata(self, f, size: int, bundle: PatternBundle, capture: Optional[ParseCapture] = None) -> _StreamState:
+        """Feeds only the head and tail regions of the file to the state machine."""
+        state = _StreamState(bundle)
+        state.full_scan = False
+        state.capture = capture
+
+        f.seek(0)
+        head = f.read(HEAD_SCAN_BYTES)
+        head = head[:head.rfind(b'\n') + 1] # Drop the partial last line
+        for offset, line in iter_lines(io.BytesIO(head)):
+            self._feed_line(state, line, offset)
+        # A thumbnail block cut by the head boundary cannot continue in the tail
+        state.thumb_open = None
+
+        f.seek(size - TAIL_SCAN_BYTES)
+        tail = f.read(TAIL_SCAN_BYTES)
+        tail = tail[tail.find(b'\n') + 1:] # Drop the partial first line
+        tail_base = size - len(tail)
+        for offset, line in iter_lines(io.BytesIO(tail)):
+            self._feed_line(state, line, tail_base + offset)
+        return state
+
+    def _scan_missing_fields(self, f, size: int, state: _StreamState):
+        """
+        Searches the whole file for the configured fields the head/tail scan did
+        not find, with a bundle of only those patterns (far cheaper than the full
+        scan, which also counts tool changes and indexes thumbnails).
+        """
+        patterns = {key: pat.pattern for (kind, key), pat in state.bundle.compiled.items()
+                    if kind == 'user' and key not in state.values}
+        cache_key = (state.bundle.fingerprint, tuple(sorted(patterns)))
+        missing = self._missing_bundles.get(cache_key)
+        if missing is None:
+            missing = self._missing_bundles[cache_key] = PatternBundle(patterns, {})
+        metrics.count("parse.missing_field_scan")
+
+        def record(matches, base):
+            for kind, key, value, (start, end) in matches:
+                if key in state.values:
+                    continue
+                if value is not None:
+                    value = value.decode('utf-8', errors='ignore')
+                self._record_match(state, kind, key, value, (base + start, base + end))
+                patterns.pop(key, None)
+                if not patterns:
+                    return
+
+        if self.use_mmap and not isinstance(f, zipfile.ZipExtFile):
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                record(missing.iter_spans(mm), 0)
+            return
+
+        # Decompressing stream: whole lines per chunk so no match is cut in two
+        f.seek(0)
+        base, carry = 0, b''
+        while patterns:
+            chunk = f.read(MISSING_SCAN_CHUNK_BYTES)
+            if not chunk:
+                record(missing.iter_spans(carry), base)
+                return
+            data = carry + chunk
+            cut = data.rfind(b'\n') + 1
+            data, carry = data[:cut], data[cut:]
+            record(missing.iter_spans(data), base)
+            base += len(data)
+
+    def _scan_mmap(self, f, bundle: PatternBundle, capture: Optional[ParseCapture] = None) -> _StreamState:
+        """
+        Full scan over the memory-mapped file with the fused bytes pattern.
+        Nothing is decoded or copied except the captured values.
+        """
+        state = _StreamState(bundle)
+        state.capture = capture
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for kind, key, value, span in bundle.iter_spans(mm):
+                if value is not None:
+                    value = value.decode('utf-8', errors='ignore')
+                self._record_match(state, kind, key, value, span)
+                if not state.pending:
+                    break
+
+            match = TOOLCHANGE_SUMMARY_BYTES_RE.search(mm)
+            if match:
+                state.summary_changes = int(match.group(1))
+
+            # Count T commands without materializing the matches
+            state.tool_calls = sum(1 for _ in TOOL_CALL_RE.finditer(mm))
+            if FIRST_TOOL_CALL_RE.match(mm):
+                state.tool_calls += 1
+
+            # Index every embedded thumbnail by byte range; nothing is decoded here
+            for begin in THUMB_BLOCK_BEGIN_RE.finditer(mm):
+                end = THUMB_END_RE.search(mm, begin.end())
+                if end is None:
+                    break
+                state.thumbnails.append(self._thumbnail_ref(begin, begin.end(), end.start()))
+
+        return state
+
+    def _record_match(self, state: _StreamState, kind: str, key: str, value: Optional[str], span=None):
+        # First match wins (same as a whole-file re.search per pattern)
+        target = state.values if kind == 'user' else state.dd_values
+        if key not in target:
+            target[key] = value
+            state.pending -= 1
+            if state.capture and span:
+                state.capture.add_match(kind, key, value, span[0], span[1])
+
+    def _metadata_complete(self, state: _StreamState) -> bool:
+        """True when the head/tail scan found everything a full scan would be needed for."""
+        if not state.values.get('time') or not state.values.get('filament_grams'):
+            return False
+        if state.summary_changes is not None:
+            return True
+        # Without a toolchange summary, only a single-filament print can skip
+        # counting T commands across the body (multi-filament values are ';' or ',' separated)
+        filament_type = state.dd_values.get('filament_type') or state.values.get('filament_type')
+        return bool(filament_type) and not re.search(r'[;,]', filament_type.strip())
+
+    def _thumbnail_ref(self, begin, start: int, end: int) -> ThumbnailRef:
+        fmt = (begin.group(1) or b'PNG').decode('ascii').upper()
+        return ThumbnailRef(width=int(begin.group(2)), height=int(begin.group(3)),
+                            offset=start, length=end - start, fmt=fmt)
+
+    def _feed_line(self, state: '_StreamState', line: bytes, offset: int):
+        """State machine step: consumes one significant line (comment or tool change) at a file offset."""
+        # Tool change (T0, T1...). T255 is the end script / virtual tool.
+        if line[:1] == b'T':
+            if int(line[1:]) != 255:
+                state.tool_calls += 1
+            return
+
+        # Inside a thumbnail block: only remember where the payload starts and ends
+        if state.thumb_open is not None:
+            if THUMB_END_RE.search(line):
+                if state.thumb_start is not None:
+                    state.thumbnails.append(self._thumbnail_ref(state.thumb_open, state.thumb_start, offset))
+                state.thumb_open = None
+            elif state.thumb_start is None:
+                state.thumb_start = offset
+            return
+
+        begin = THUMB_BEGIN_RE.search(line)
+        if begin:
+            state.thumb_open = begin
+            state.thumb_start = None
+            return
+
+        if not (state.pending or state.summary_changes is None):
+            return
+
+        text = line.decode('utf-8', errors='ignore')
+        if state.summary_changes is None:
+            match = TOOLCHANGE_SUMMARY_RE.search(text)
+            if match:
+                state.summary_changes = int(match.group(1))
+        if state.pending:
+            for kind, key, value, (start, end) in state.bundle.iter_spans(text):
+                # Spans are made file-relative (exact for ASCII lines)
+                self._record_match(state, kind, key, value, (offset + start, offset + end))
+
+    def _open_file_safe(self, path: str, retries=3):
         for i in range(retries):
             try:
-                with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                    return f.read()
+                return open(path, 'rb')
             except Exception as e:
                 time.sleep(1)
                 if i == retries - 1:
                     self.logger.error(f"Failed to read file: {e}")
-                    return ""
-        return ""
+                    return None
+        return None
 
-    def _extract_regex_data(self, content: str, stats: GCodeStats):
-        for key, pat in self.patterns.items():
+    def _apply_regex_data(self, values: dict, stats: GCodeStats):
+        for key, val in values.items():
             if key == 'time': continue # Handled in _calculate_time
             
-            match = re.search(pat, content, re.IGNORECASE)
-            if match:
-                # Find the first non-None group
-                val = next((g for g in match.groups() if g is not None), None)
-                if val:
-                    val = val.strip()
-                    if key == 'filament_grams': 
-                        stats.grams = self._extract_float(val)
-                    elif key == 'filament_meters': 
-                        stats.filament_length_m = self._extract_float(val) / 1000.0
-                    elif key == 'filament_type': 
-                        # Remove quotes and surrounding whitespace
-                        stats.filament_type = val.replace('"', '').replace("'", "").strip()
-                    elif key == 'total_layers': 
-                        stats.total_layers = int(self._extract_float(val))
-                    elif key == 'printer_model':
-                        stats.printer_model = val.replace('"', '').replace("'", "").strip()
-                    elif key == 'printer_model': 
-                        stats.printer_model = val.strip()
+            if val:
+                val = val.strip()
+                if key == 'filament_grams': 
+                    stats.grams = self._extract_float(val)
+                elif key == 'filament_meters': 
+                    stats.filament_length_m = self._extract_float(val) / 1000.0
+                elif key == 'filament_type': 
+                    # Remove quotes and surrounding whitespace
+                    stats.filament_type = val.replace('"', '').replace("'", "").strip()
+                elif key == 'total_layers': 
+                    stats.total_layers = int(self._extract_float(val))
+                elif key == 'printer_model':
+                    stats.printer_model = val.replace('"', '').replace("'", "").strip()
 
     def _extract_float(self, text: str) -> float:
         try:
@@ -123,28 +530,20 @@ class GCodeParser:
             pass
         return 0
 
-    def _extract_ddreams_data(self, content: str, stats: GCodeStats):
-        for key, pat in self.dd_patterns.items():
-            match = re.search(pat, content, re.IGNORECASE)
-            if match:
-                val = next((g for g in match.groups() if g is not None), None)
-                if val:
-                    cleaned_val = val.strip()
-                    # Ignore template placeholders (e.g. {variable}) or garbage
-                    if '{' in cleaned_val or '}' in cleaned_val:
-                        continue
-                    setattr(stats, key, cleaned_val)
-
-    def _calculate_time(self, content: str, stats: GCodeStats):
-        val = None
+    def _apply_ddreams_data(self, values: dict, stats: GCodeStats):
+        for key, val in values.items():
+            if val:
+                cleaned_val = val.strip()
+                # Ignore template placeholders (e.g. {variable}) or garbage
+                if '{' in cleaned_val or '}' in cleaned_val:
+                    continue
+                setattr(stats, key, cleaned_val)
 
+    def _calculate_time(self, val: Optional[str], stats: GCodeStats):
         # Single source of truth: user-calibrated pattern for "time"
-        match = re.search(self.patterns['time'], content, re.IGNORECASE)
-        if match:
-            val = next((g for g in match.groups() if g is not None), None)
-
         if val:
-            val = val.strip()
+            # Bambu writes "model printing time: 56m 0s; total estimated time: 1h 1m 0s" on one line
+            val = val.split(';', 1)[0].strip()
             if 'd' in val or 'h' in val or 'm' in val or 's' in val:
                 d, h, m, s = 0, 0, 0, 0
                 try:
@@ -179,55 +578,94 @@ class GCodeParser:
                 except:
                     pass
 
-    def _count_color_changes(self, content: str, stats: GCodeStats):
-        # Find all T commands (T0, T1, etc.) at start of line
-        t_matches = re.findall(r'(?m)^T(\d+)', content)
-        
-        # Filter out T255 (End script / Virtual)
-        valid_tools = [t for t in t_matches if int(t) != 255]
-        
-        if len(valid_tools) > 1:
+    def _count_color_changes(self, state: _StreamState, stats: GCodeStats):
+        # Prefer the slicer's own toolchange total when it wrote one
+        if state.summary_changes is not None:
+            stats.multicolor_changes = state.summary_changes
+            return
+
+        # Head/tail scan only completes without a summary for single-filament prints
+        if not state.full_scan:
+            return
+
+        # tool_calls = T commands at start of line, excluding T255 (End script / Virtual)
+        tool_calls = state.tool_calls
+        if tool_calls > 1:
             # Changes = Transitions (Count - 1)
             # Example: T0 -> T1 -> T0 (3 tools called -> 2 changes)
-            stats.multicolor_changes = len(valid_tools) - 1
-
-    def _extract_thumbnail(self, content: str, stats: GCodeStats):
-        thumb_match = re.search(r'; thumbnail begin \d+x\d+ \d+\n((?:.|\n)*?); thumbnail end', content)
-        if thumb_match:
-            stats.thumbnail_b64 = thumb_match.group(1).replace('; ', '').replace('\n', '')
-
-    def scan_candidates(self, file_path: str) -> dict:
-        """Scans the file for lines that might contain metadata."""
-        candidates = {
-            'time': [],
-            'filament_grams': [],
-            'printer_model': [],
-            'filament_type': [],
-            'total_layers': []
-        }
-        content = self._read_file_safe(file_path)
-        if not content: return candidates
-
-        for line in content.splitlines():
-            line = line.strip()
-            if not line.startswith(';'): continue
-            if len(line) > 200: continue # Skip insanely long lines (likely binary or G-code blocks)
-            
-            # Simple heuristic
-            lower = line.lower()
-            if 'time' in lower and ('=' in line or ':' in line):
-                candidates['time'].append(line)
-            if ('gram' in lower or 'weight' in lower) and ('=' in line or ':' in line):
-                candidates['filament_grams'].append(line)
-            if 'model' in lower and ('=' in line or ':' in line) and 'printer' in lower:
-                candidates['printer_model'].append(line)
-            if 'filament' in lower and 'type' in lower and ('=' in line or ':' in line):
-                candidates['filament_type'].append(line)
-            if 'layer' in lower and 'count' in lower and ('=' in line or ':' in line):
-                candidates['total_layers'].append(line)
-                
+            stats.multicolor_changes = tool_calls - 1
+
+    def scan_candidates(self, file_path: str, progress: Optional[Callable[[float], None]] = None) -> dict:
+        """
+        Collects comment lines that might contain metadata, for the calibration
+        assistant. Only the head (header block, thumbnails) and tail (stats and
+        config blocks) regions are streamed, and the scan stops as soon as every
+        category has CANDIDATES_PER_KEY lines. progress(fraction) is called
+        from the calling thread after each chunk.
+        """
+        candidates = {key: [] for key, _ in CANDIDATE_RULES}
+        raw = self._open_file_safe(file_path)
+        if not raw: return candidates
+
+        seen = set()
+        # .bgcode: its metadata blocks as comments; 3MF: the first plate's G-code member
+        with metrics.timer("calibration.scan"), raw, open_gcode_text(raw) as (f, size):
+            if size <= CANDIDATE_HEAD_BYTES + CANDIDATE_TAIL_BYTES:
+                regions = [(0, size)]
+            else:
+                regions = [(0, CANDIDATE_HEAD_BYTES), (size - CANDIDATE_TAIL_BYTES, CANDIDATE_TAIL_BYTES)]
+            total = sum(length for _, length in regions)
+            done = 0
+            for start, length in regions:
+                f.seek(start)
+                if start:
+                    f.readline() # Drop the partial first line
+                in_thumbnail = False
+                for line in self._iter_region_comments(f, start + length):
+                    # Thumbnail payloads are base64: never metadata, and may contain "time" by chance
+                    if in_thumbnail:
+                        in_thumbnail = not THUMB_END_RE.search(line)
+                        continue
+                    if THUMB_BEGIN_RE.search(line):
+                        in_thumbnail = True
+                        continue
+                    if self._add_candidate(candidates, seen, line) and self._candidates_full(candidates):
+                        if progress: progress(1.0)
+                        return candidates
+                done += length
+                if progress: progress(done / total)
         return candidates
-    
+
+    @staticmethod
+    def _iter_region_comments(f, stop: int):
+        """Yields the stripped comment lines of the stream up to byte offset stop."""
+        while f.tell() < stop:
+            chunk = f.read(min(CANDIDATE_CHUNK_BYTES, stop - f.tell()))
+            if not chunk:
+                return
+            chunk += f.readline() # Complete the last line
+            for m in COMMENT_LINE_RE.finditer(chunk):
+                yield m.group().strip()
+
+    @staticmethod
+    def _add_candidate(candidates: dict, seen: set, raw: bytes) -> bool:
+        if len(raw) > 200: return False # Skip insanely long lines (likely binary or G-code blocks)
+        line = raw.decode('utf-8', errors='ignore')
+        if line in seen or ('=' not in line and ':' not in line): return False
+        seen.add(line)
+        lower = line.lower()
+        added = False
+        for key, words in CANDIDATE_RULES:
+            found = candidates[key]
+            if len(found) < CANDIDATES_PER_KEY and all(any(w in lower for w in alts) for alts in words):
+                found.append(line)
+                added = True
+        return added
+
+    @staticmethod
+    def _candidates_full(candidates: dict) -> bool:
+        return all(len(found) >= CANDIDATES_PER_KEY for found in candidates.values())
+
     def learn_pattern(self, key: str, line: str) -> tuple[bool, str, str]:
         """Generates a regex from a user-selected line and saves it.
         Returns: (success, message, regex_generated)
@@ -273,7 +711,6 @@ class GCodeParser:
         if len(val) > 100:
             return False, f"El valor extraído es demasiado largo ({len(val)} chars). Probablemente sea basura o un comentario largo.\nValor: {val[:50]}...", new_regex
 
-        self.pattern_manager.save_pattern(key, new_regex)
-        self.patterns = self.pattern_manager.patterns # Update runtime
+        self.pattern_manager.save_pattern(key, new_regex) # Also recompiles the pattern bundle
         
         return True, f"Patrón aprendido correctamente.\nValor extraído: '{val}'", new_regex
@@ -1,12 +1,121 @@
+import hashlib
 import json
 import os
-from typing import Dict
+import re
+from typing import Dict, Iterator, Optional, Tuple
+from utils.paths import get_config_dir
+
+# Quantifier characters: a pattern starting with ';' followed by one of these
+# does not require a literal ';' and cannot share the fused prefix.
+_QUANTIFIERS = ('*', '+', '?', '{')
+
+
+class PatternBundle:
+    """
+    Compiled view of a pattern set. User patterns and the DDREAMS block patterns
+    are fused into one case-insensitive alternation with a named group per field,
+    so a single scan yields every field. When all patterns start with a literal ';'
+    it is factored out of the alternation, letting the regex engine jump straight
+    to comment characters instead of trying every branch at every position.
+    """
+    def __init__(self, patterns: Dict[str, str], ddreams_patterns: Dict[str, str]):
+        self.fingerprint = hashlib.sha1(
+            json.dumps([patterns, ddreams_patterns], sort_keys=True).encode('utf-8')).hexdigest()
+
+        self.compiled = {} # (kind, key) -> compiled str pattern
+        for kind, pats in (('user', patterns), ('ddreams', ddreams_patterns)):
+            for key, pat in pats.items():
+                try:
+                    self.compiled[(kind, key)] = re.compile(pat, re.IGNORECASE)
+                except re.error as e:
+                    print(f"Invalid pattern for {key}: {e}")
+        self._compiled_bytes = None
+
+        sources = {k: self.compiled[k].pattern for k in self.compiled}
+        self.prefixed = bool(sources) and all(
+            p.startswith(';') and p[1:2] not in _QUANTIFIERS for p in sources.values())
+
+        # Map each outer group index to its field and number of inner groups
+        self._groups = {}
+        parts = []
+        index = 1
+        for (kind, key), pat in sources.items():
+            body = pat[1:] if self.prefixed else pat
+            parts.append(f"(?P<{kind}__{key}>{body})")
+            inner = self.compiled[(kind, key)].groups
+            self._groups[index] = (kind, key, inner)
+            index += 1 + inner
+        fused = "|".join(parts)
+        if self.prefixed:
+            fused = f";(?:{fused})"
+
+        try:
+            self.fused = re.compile(fused, re.IGNORECASE) if parts else None
+            # Whole-buffer (bytes) scans are only fast with the shared ';' prefix;
+            # otherwise every branch is tried at every byte and per-field searches win.
+            self.fused_bytes = re.compile(fused.encode('utf-8'), re.IGNORECASE) if parts and self.prefixed else None
+        except re.error as e:
+            # e.g. numbered backreferences that no longer line up once fused
+            print(f"Could not fuse patterns: {e}")
+            self.fused = None
+            self.fused_bytes = None
+
+    @property
+    def compiled_bytes(self) -> Dict[Tuple[str, str], 're.Pattern']:
+        """Per-field bytes patterns, for whole-buffer searches when fusing is not possible."""
+        if self._compiled_bytes is None:
+            self._compiled_bytes = {k: re.compile(p.pattern.encode('utf-8'), re.IGNORECASE)
+                                    for k, p in self.compiled.items()}
+        return self._compiled_bytes
+
+    def iter_matches(self, text) -> Iterator[Tuple[str, str, Optional[str]]]:
+        """Yields (kind, key, value) for every field match in text (str or bytes)."""
+        for kind, key, value, _ in self.iter_spans(text):
+            yield kind, key, value
+
+    def iter_spans(self, text) -> Iterator[Tuple[str, str, Optional[str], Tuple[int, int]]]:
+        """Like iter_matches, plus the (start, end) span of each match in text."""
+        fused = self.fused if isinstance(text, str) else self.fused_bytes
+        if fused is None:
+            patterns = self.compiled if isinstance(text, str) else self.compiled_bytes
+            for (kind, key), pat in patterns.items():
+                match = pat.search(text)
+                if match:
+                    yield kind, key, next((g for g in match.groups() if g is not None), None), match.span()
+            return
+
+        # The alternation reports one field per position, so a line that two fields'
+        # patterns match would only yield the first: the rest of that line is checked
+        # with the per-field patterns, as separate searches per line used to do.
+        patterns = self.compiled if isinstance(text, str) else self.compiled_bytes
+        newline = '\n' if isinstance(text, str) else b'\n'
+        pos = 0
+        while True:
+            match = fused.search(text, pos)
+            if match is None:
+                return
+            kind, key, inner = self._groups[match.lastindex]
+            start = match.lastindex + 1
+            value = next((g for g in match.groups()[start - 1:start - 1 + inner] if g is not None), None)
+            yield kind, key, value, match.span()
+
+            line_start = text.rfind(newline, 0, match.start()) + 1
+            line_end = text.find(newline, match.end())
+            if line_end < 0:
+                line_end = len(text)
+            for other, pat in patterns.items():
+                if other == (kind, key):
+                    continue
+                extra = pat.search(text, line_start, line_end)
+                if extra:
+                    yield other[0], other[1], next((g for g in extra.groups() if g is not None), None), extra.span()
+            pos = max(line_end, match.end(), match.start() + 1)
+
 
 class PatternManager:
     def __init__(self):
-        self.config_dir = os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), 'ddreams_config')
+        self.config_dir = get_config_dir()
         self.config_file = os.path.join(self.config_dir, 'user_patterns.json')
-        os.makedirs(self.config_dir, exist_ok=True)
         
         self.default_patterns = {
             'time': r";\s*(?:estimated printing time \(normal mode\)|total estimated time|model printing time)\s*[:=]\s*(.*)",
@@ -16,8 +125,26 @@ class PatternManager:
             'total_layers': r";\s*total layers count\s*[:=]\s*(\d+)",
             'printer_model': r";\s*printer_model\s*[:=]\s*(.*)",
         }
+
+        # DDREAMS block written by the Start G-code snippet (not user-calibratable)
+        self.ddreams_patterns = {
+            'quality_profile': r"; ddreams_layer_height\s*=\s*([^\n\r]*)",
+            'filament_type': r"; ddreams_filament_type\s*=\s*([^\n\r]*)",
+            'printer_model': r"; ddreams_printer_model\s*=\s*([^\n\r]*)",
+            'nozzle_diameter': r"; ddreams_nozzle\s*=\s*([^\n\r]*)"
+        }
         
         self.patterns = self._load_patterns()
+        self.bundle = PatternBundle(self.patterns, self.ddreams_patterns)
+
+    def set_patterns(self, patterns: Dict[str, str]):
+        """Replaces the in-memory pattern set (without saving) and recompiles if it changed."""
+        if patterns != self.patterns:
+            self.patterns = dict(patterns)
+            self._rebuild()
+
+    def _rebuild(self):
+        self.bundle = PatternBundle(self.patterns, self.ddreams_patterns)
 
     def _load_patterns(self) -> Dict[str, str]:
         if os.path.exists(self.config_file):
@@ -33,6 +160,7 @@ class PatternManager:
     def save_pattern(self, key: str, regex: str):
         # Update in-memory
         self.patterns[key] = regex
+        self._rebuild()
         
         # Load existing file first to preserve other keys if they exist
         existing = {}
@@ -55,5 +183,6 @@ class PatternManager:
 
     def reset_defaults(self):
         self.patterns = self.default_patterns.copy()
+        self._rebuild()
         if os.path.exists(self.config_file):
             os.remove(self.config_file)
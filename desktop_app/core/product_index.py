@@ -0,0 +1,108 @@
+import bisect
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional
+from domain.models import Product
+
+
+def normalize(text: str) -> str:
+    """Lowercase, accent-free, single-spaced form used for matching."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.lower().split())
+
+
+def _trigrams(text: str):
+    return {text[i:i+3] for i in range(len(text) - 2)}
+
+
+class ProductIndex:
+    """
+    Search index over the product catalog, built once per product list.
+    - by_id: O(1) lookup by product id.
+    - Sorted normalized names (and word suffixes) for O(log n) prefix search.
+    - Trigram postings for substring matches anywhere in the name.
+    Every product gets a unique display label, so duplicate names still
+    resolve to the right product.
+    """
+    def __init__(self, products: List[Product]):
+        self.products = list(products)
+        self.by_id: Dict[str, Product] = {p.id: p for p in self.products}
+        self._norm = [normalize(p.name) for p in self.products]
+
+        # Labels: the plain name, or the name plus a short id when it repeats
+        counts = defaultdict(int)
+        for n in self._norm:
+            counts[n] += 1
+        self.labels = [
+            p.name if counts[n] == 1 else f"{p.name} ({p.id[:6]})"
+            for p, n in zip(self.products, self._norm)
+        ]
+        self.by_label: Dict[str, Product] = dict(zip(self.labels, self.products))
+        self._label_by_id = {p.id: label for p, label in zip(self.products, self.labels)}
+
+        # Prefix index over each word start ("taza grande" -> "taza grande", "grande")
+        entries = []
+        for i, n in enumerate(self._norm):
+            start = 0
+            for word in n.split(' '):
+                entries.append((n[start:], i))
+                start += len(word) + 1
+        entries.sort()
+        self._prefix_keys = [e[0] for e in entries]
+        self._prefix_ids = [e[1] for e in entries]
+
+        self._grams: Dict[str, List[int]] = defaultdict(list)
+        for i, n in enumerate(self._norm):
+            for g in _trigrams(n):
+                self._grams[g].append(i)
+
+    def __len__(self):
+        return len(self.products)
+
+    def get(self, product_id: str) -> Optional[Product]:
+        return self.by_id.get(product_id)
+
+    def label_of(self, product: Product) -> str:
+        return self._label_by_id.get(product.id, product.name)
+
+    def search(self, query: str, limit: int = 20) -> List[int]:
+        """
+        Indices of up to `limit` products matching `query`: names or words
+        starting with it first (alphabetically), then substring matches.
+        """
+        q = normalize(query)
+        if not q:
+            return list(range(min(limit, len(self.products))))
+
+        results = []
+        seen = set()
+
+        def add(i):
+            if i not in seen:
+                seen.add(i)
+                results.append(i)
+
+        # Prefix matches: a contiguous range of the sorted keys, read only up to the limit
+        k = bisect.bisect_left(self._prefix_keys, q)
+        while k < len(self._prefix_keys) and self._prefix_keys[k].startswith(q):
+            add(self._prefix_ids[k])
+            if len(results) >= limit:
+                return results
+            k += 1
+
+        # Substring matches: intersect trigram postings starting with the rarest
+        postings = sorted((self._grams.get(g, ()) for g in _trigrams(q)), key=len)
+        if not postings or not postings[0]:
+            return results # Queries shorter than 3 chars only match prefixes
+        candidates = set(postings[0])
+        for plist in postings[1:]:
+            candidates.intersection_update(plist)
+            if not candidates:
+                return results
+        for i in sorted(candidates):
+            if q in self._norm[i]:
+                add(i)
+                if len(results) >= limit:
+                    break
+        return results
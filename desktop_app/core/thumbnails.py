@@ -0,0 +1,38 @@
+import base64
+import zipfile
+from typing import List, Optional
+from domain.models import ThumbnailRef
+from utils.metrics import metrics
+
+
+def best_fit(thumbnails: List[ThumbnailRef], width: int, height: int) -> Optional[ThumbnailRef]:
+    """
+    Picks the smallest thumbnail that covers width x height, or the largest one
+    if none does. Formats PIL cannot always open (QOI) are only used as a last resort.
+    """
+    if not thumbnails:
+        return None
+    candidates = [t for t in thumbnails if t.fmt != 'QOI'] or thumbnails
+    covering = [t for t in candidates if t.width >= width and t.height >= height]
+    if covering:
+        return min(covering, key=lambda t: t.width * t.height)
+    return max(candidates, key=lambda t: t.width * t.height)
+
+
+def read_thumbnail(ref: ThumbnailRef) -> bytes:
+    """
+    Reads the referenced byte range and decodes it to image bytes. The raw
+    "; <base64>" lines are passed straight to the decoder, which discards the
+    comment markers, spaces and newlines instead of building cleaned copies.
+    Raw ranges (.bgcode blocks, 3MF members) are already image bytes.
+    """
+    with metrics.timer("thumbnail.read"):
+        with open(ref.path, 'rb') as f:
+            if ref.member:
+                with zipfile.ZipFile(f) as zf, zf.open(ref.member) as member:
+                    member.seek(ref.offset)
+                    data = member.read(ref.length)
+            else:
+                f.seek(ref.offset)
+                data = f.read(ref.length)
+        return base64.b64decode(data) if ref.encoding == 'base64' else data
@@ -7,17 +7,22 @@ if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
 # EXPLICIT IMPORTS FOR PYINSTALLER (Flattened)
-try:
+# Never called: PyInstaller finds these by scanning the bytecode, while the
+# launcher process does not pay for importing the GUI stack at runtime.
+def _pyinstaller_imports():
     import ui.app
+    import batch
     import core.parser
+    import core.parse_pool
     import services.api
     import utils.logger
     import domain.models
     import config
-except ImportError:
-    pass
 
+import multiprocessing
 from main import main
 
 if __name__ == "__main__":
+    # Required for the parse process pool in PyInstaller builds
+    multiprocessing.freeze_support()
     main()
@@ -7,6 +7,19 @@ class Product:
     name: str
     image_url: Optional[str] = None
 
+@dataclass
+class ThumbnailRef:
+    """Location of an embedded thumbnail: a byte range of base64 comment lines in the G-code file
+    (encoding "base64"), or of the image itself in a .bgcode block or 3MF zip member (encoding "raw")."""
+    width: int
+    height: int
+    offset: int
+    length: int
+    fmt: str = "PNG"
+    path: str = ""
+    encoding: str = "base64"
+    member: str = "" # Zip member the range belongs to (3MF), empty for plain files
+
 @dataclass
 class GCodeStats:
     grams: float = 0.0
@@ -19,7 +32,11 @@ class GCodeStats:
     total_layers: int = 0
     filament_length_m: float = 0.0
     multicolor_changes: int = 0
-    thumbnail_b64: Optional[str] = None
+    thumbnails: List[ThumbnailRef] = field(default_factory=list)
+
+    def __post_init__(self):
+        # Entries restored from JSON (parse cache) arrive as plain dicts
+        self.thumbnails = [t if isinstance(t, ThumbnailRef) else ThumbnailRef(**t) for t in self.thumbnails]
     
     def to_dict(self):
         return {
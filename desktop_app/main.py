@@ -6,23 +6,27 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
+# Launcher path: standard library + small local modules only.
+# GUI, PIL, parser and HTTP modules are imported in run_window().
 import time
-import shutil
-import subprocess
-import tkinter as tk
-import customtkinter as ctk
+import multiprocessing
 from utils.logger import Logger
-from core.parser import GCodeParser
-from services.api import ProductionService
-from ui.app import MainWindow
 from core.ipc import SingleInstanceManager
+from utils.files import wait_until_stable, snapshot_file
+from utils.startup import StartupTimer
+from config import STARTUP_BUDGET, WATCH_FOLDERS, WATCH_INTERVAL, WATCH_SETTLE, WATCH_RECURSIVE
 
 def main():
     logger = Logger()
-    
-    # Configure CustomTkinter
-    ctk.set_appearance_mode("Dark")
-    ctk.set_default_color_theme("blue")
+    timer = StartupTimer(logger, STARTUP_BUDGET)
+
+    # Headless bulk ingestion: no window, no single-instance hand-off
+    if "--batch" in sys.argv:
+        from batch import run_batch
+        sys.exit(run_batch([a for a in sys.argv[1:] if a != "--batch"], logger))
+    if "--watch" in sys.argv:
+        from batch import run_watch
+        sys.exit(run_watch([a for a in sys.argv[1:] if a != "--watch"], logger))
 
     # 1. Argument Handling
     if len(sys.argv) < 2:
@@ -33,31 +37,28 @@ def main():
     # 2. Detached Mode Launcher
     if "--worker" not in sys.argv:
         try:
-            logger.debug("Launcher started. Spawning worker...")
+            logger.debug("Launcher started.")
             temp_dir = os.path.join(os.environ.get('TEMP', os.getcwd()), 'ddreams_temp')
             os.makedirs(temp_dir, exist_ok=True)
-            temp_file = os.path.join(temp_dir, f"temp_{int(time.time())}_{os.path.basename(file_path)}")
-            
-            # Robust copy loop
-            max_retries = 5
-            for i in range(max_retries):
-                try:
-                    # Check if source exists and has size
-                    if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-                        shutil.copy2(file_path, temp_file)
-                        break
-                    else:
-                        logger.debug(f"Source file empty or missing, waiting... ({i+1}/{max_retries})")
-                        time.sleep(1)
-                except Exception as e:
-                    logger.debug(f"Copy failed, retrying... ({i+1}/{max_retries}): {e}")
-                    time.sleep(1)
+            temp_file = os.path.join(temp_dir, f"temp_{time.time_ns()}_{os.path.basename(file_path)}")
             
-            if not os.path.exists(temp_file):
-                 logger.error("Failed to copy input file to temp location.")
+            # Wait until the slicer stops writing, then snapshot it (hardlink/reflink before copying)
+            if not wait_until_stable(file_path):
+                logger.debug("Source file not stable yet, snapshotting anyway")
+            method = snapshot_file(file_path, temp_file, logger)
+            if method is None:
+                 logger.error("Failed to snapshot input file to temp location.")
                  # Fallback: try to pass original path if copy failed
                  temp_file = file_path
+            else:
+                 logger.debug(f"Snapshot by {method}: {temp_file}")
+
+            # Fast path: a window is already open, hand the file over and exit
+            # without starting a second interpreter
+            if SingleInstanceManager(logger=logger).send_to_main(temp_file, quiet=True):
+                sys.exit(0)
 
+            logger.debug("No main instance. Spawning worker...")
             if getattr(sys, 'frozen', False):
                 exe_path = sys.executable
                 cmd = [exe_path, temp_file, "--worker"]
@@ -65,7 +66,8 @@ def main():
                 # Running from source - use absolute path to self
                 cmd = [sys.executable, os.path.abspath(__file__), temp_file, "--worker"]
                 
-            subprocess.Popen(cmd, creationflags=0x00000008, close_fds=True)
+            import subprocess
+            subprocess.Popen(cmd, creationflags=0x00000008, close_fds=True, env=timer.child_env())
             sys.exit(0)
         except Exception as e:
             logger.error(f"Launcher failed: {e}")
@@ -89,23 +91,61 @@ def main():
             # But if IPC fails, maybe the port is stuck. Let's run standalone as fallback.
             pass 
 
+    run_window(file_path, logger, ipc, timer)
+
+def run_window(file_path: str, logger: Logger, ipc: SingleInstanceManager, timer: StartupTimer):
+    with timer.phase("import gui"):
+        import customtkinter as ctk
+    with timer.phase("import core"):
+        from core.parser import GCodeParser
+        from core.parse_pool import ParsePool
+        from services.api import ProductionService
+    with timer.phase("import ui"):
+        from ui.app import MainWindow
+
+    # Configure CustomTkinter
+    ctk.set_appearance_mode("Dark")
+    ctk.set_default_color_theme("blue")
+
     # 4. Dependency Injection
-    parser = GCodeParser(logger)
-    service = ProductionService(logger)
+    with timer.phase("services"):
+        parser = GCodeParser(logger)
+        service = ProductionService(logger)
+        parse_pool = ParsePool(parser, logger)
 
     # 5. Launch UI
-    root = ctk.CTk()
-    app = MainWindow(root, file_path, parser, service)
+    with timer.phase("window"):
+        root = ctk.CTk()
+        app = MainWindow(root, file_path, parser, service, parse_pool)
+    # Reported once the window is actually on screen
+    root.after_idle(timer.report)
     
     # Start IPC Server to listen for more files
-    def on_new_file(new_path):
+    def on_new_file(new_path, options):
         # Schedule UI update on main thread
         root.after(0, lambda: app.add_plate(new_path))
 
     ipc.start_server(on_new_file)
+
+    # Files exported to the watch folders join the plate list like slicer hand-offs
+    watcher = None
+    if WATCH_FOLDERS:
+        from services.folder_watcher import FolderWatcher
+        from utils.paths import get_config_dir
+        def on_watched_files(paths):
+            for path in paths:
+                root.after(0, lambda p=path: app.add_plate(p))
+        watcher = FolderWatcher(WATCH_FOLDERS, on_watched_files, logger,
+                                state_path=FolderWatcher.state_path_for(get_config_dir(), WATCH_FOLDERS),
+                                interval=WATCH_INTERVAL, settle=WATCH_SETTLE, recursive=WATCH_RECURSIVE)
+        watcher.start()
     
     def on_close():
         ipc.stop()
+        if watcher:
+            watcher.stop()
+        parse_pool.shutdown()
+        service.stop()
         root.destroy()
         try:
             # Only delete if it's a temp file we created
@@ -114,9 +154,9 @@ def main():
                 # For now, we only delete the initial one or rely on OS temp cleanup.
                 # The app.plates list will have other paths too.
                 # We can iterate app.plates and delete if they are temp.
-                for plate in app.plates:
-                     if "ddreams_temp" in plate['path']:
-                         try: os.remove(plate['path'])
+                for path in [p['path'] for p in app.plates] + list(app.pending):
+                     if "ddreams_temp" in path:
+                         try: os.remove(path)
                          except: pass
         except: pass
     
@@ -124,4 +164,6 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    # Required for the parse process pool in PyInstaller builds
+    multiprocessing.freeze_support()
     main()
@@ -1,31 +1,125 @@
-import json
-import urllib.request
-import urllib.error
-from typing import List, Optional
+import uuid
+from typing import Callable, List, Optional, Tuple
 from domain.models import Product, GCodeStats
 from utils.logger import Logger
-from config import API_URL, API_PRODUCTS_URL, SECRET_TOKEN, MACHINE_ID
+from utils.paths import get_config_dir
+from services.http_client import HttpClient, HttpError
+from services.outbox import Outbox, OutboxWorker, OutboxEntry, DeliveryError
+from services.product_catalog import ProductCatalog
+from services.thumbnail_uploader import ThumbnailUploader
+from core.thumbnails import best_fit
+from utils.metrics import metrics
+from config import API_URL, API_PRODUCTS_URL, API_BATCH_URL, API_BATCH_MAX_PLATES, API_THUMBNAILS_URL, THUMBNAIL_UPLOAD_SIZE, SECRET_TOKEN, MACHINE_ID, API_TIMEOUT_PRODUCTS, API_TIMEOUT_SEND, API_MAX_RETRIES, PRODUCTS_CACHE_TTL
+
+SEND_NOW_HOLD = 300 # Seconds the background sync leaves an entry alone while send_now delivers it
+
 
 class ProductionService:
-    def __init__(self, logger: Logger):
+    def __init__(self, logger: Logger, client: Optional[HttpClient] = None, outbox: Optional[Outbox] = None):
         self.logger = logger
+        # One pooled keep-alive client: the TLS handshake is paid once per session
+        self.client = client or HttpClient(logger, timeout=API_TIMEOUT_SEND, max_retries=API_MAX_RETRIES)
+        self.outbox = outbox or Outbox.in_dir(get_config_dir(), logger)
+        self.catalog = ProductCatalog(get_config_dir(), logger, ttl=PRODUCTS_CACHE_TTL)
+        self.thumbnails = ThumbnailUploader(self.client, logger, get_config_dir(), API_THUMBNAILS_URL, SECRET_TOKEN,
+                                            outbox=self.outbox)
+        self.worker = None
+
+    def start_background_sync(self, on_delivered: Optional[Callable[[OutboxEntry, str], None]] = None,
+                              on_failed: Optional[Callable[[OutboxEntry, str], None]] = None):
+        """Starts draining the outbox (including entries left over from previous runs)."""
+        if self.worker is None:
+            self.worker = OutboxWorker(self.outbox, self.deliver, self.logger,
+                                       on_delivered=on_delivered, on_failed=on_failed)
+            self.worker.start()
+            self.thumbnails.start()
+
+    def stop(self):
+        if self.worker is not None:
+            self.worker.stop()
+        self.thumbnails.stop()
+        self.client.close()
+
+    def pending_count(self) -> int:
+        return self.outbox.pending_count()
 
-    def get_products(self) -> List[Product]:
+    def get_cached_products(self) -> List[Product]:
+        """Products from the local snapshot (may be stale or empty). No network."""
+        return self.catalog.products
+
+    def get_products(self, force: bool = False) -> List[Product]:
+        """
+        Returns the product list, revalidating the snapshot with If-None-Match
+        once its TTL has expired. Falls back to the snapshot when offline.
+        """
+        if not force and self.catalog.is_fresh():
+            return self.catalog.products
         try:
             url = f"{API_PRODUCTS_URL}?secret_token={SECRET_TOKEN}"
-            with urllib.request.urlopen(url, timeout=5) as res:
-                if res.getcode() == 200:
-                    data = json.loads(res.read())
-                    return [Product(id=p['id'], name=p['name'], image_url=p.get('imageUrl')) for p in data]
+            headers = {'If-None-Match': self.catalog.etag} if self.catalog.etag and self.catalog.products else None
+            res = self.client.get(url, headers=headers, timeout=API_TIMEOUT_PRODUCTS)
+            if res.status == 304:
+                self.catalog.touch()
+            elif res.status == 200:
+                data = res.json()
+                products = [Product(id=p['id'], name=p['name'], image_url=p.get('imageUrl')) for p in data]
+                self.catalog.update(products, res.headers.get('etag'))
+            else:
+                self.logger.error(f"Error fetching products: HTTP {res.status}")
         except Exception as e:
             self.logger.error(f"Error fetching products: {e}")
-            return []
-        return []
+        return self.catalog.products
 
     def send_data(self, stats: GCodeStats, filename: str, product_id: Optional[str], name: str, version: str, target: str = 'product') -> str:
+        """Queues the payload in the durable outbox and returns its idempotency key immediately."""
+        payload = self._payload(stats, filename, product_id, name, version, target)
+        with metrics.timer("outbox.enqueue"):
+            key = self.outbox.enqueue(payload)
+        if self.worker is not None:
+            self.worker.wake()
+        return key
+
+    def send_plates(self, plates: List[Tuple[GCodeStats, str]], aggregate: GCodeStats, filename: str,
+                    product_id: Optional[str], name: str, version: str, target: str = 'product') -> str:
+        """
+        Queues a multi-plate job: the aggregate plus one payload per plate
+        ((stats, file name) pairs), sent to the batch endpoint in one request
+        per API_BATCH_MAX_PLATES plates. Returns the key of the entry carrying
+        the aggregate, which is also the inbox id of the job.
+        """
+        parent_key = str(uuid.uuid4())
+        summary = self._payload(aggregate, filename, product_id, name, version, target)
+        summary['plateCount'] = len(plates)
+        items = []
+        for index, (stats, plate_file) in enumerate(plates):
+            item = stats.to_dict()
+            item.update({
+                "index": index,
+                "name": plate_file,
+                "fileName": plate_file,
+                "scriptVersion": version,
+                "idempotencyKey": f"{parent_key}-{index}"
+            })
+            if MACHINE_ID:
+                item['machineId'] = MACHINE_ID
+            thumbnail_hash = self._thumbnail_hash(stats)
+            if thumbnail_hash:
+                item['thumbnailHash'] = thumbnail_hash
+            items.append(item)
+
+        with metrics.timer("outbox.enqueue"):
+            for n, start in enumerate(range(0, len(items), API_BATCH_MAX_PLATES)):
+                payload = {'parentKey': parent_key, 'plates': items[start:start + API_BATCH_MAX_PLATES]}
+                if n == 0:
+                    payload['aggregate'] = summary
+                self.outbox.enqueue(payload, key=parent_key if n == 0 else f"{parent_key}-chunk{n}")
+        if self.worker is not None:
+            self.worker.wake()
+        return parent_key
+
+    def _payload(self, stats: GCodeStats, filename: str, product_id: Optional[str], name: str, version: str, target: str) -> dict:
         payload = stats.to_dict()
         payload.update({
-            "secret_token": SECRET_TOKEN,
             "name": name,
             "fileName": filename,
             "scriptVersion": version,
@@ -38,30 +132,94 @@ class ProductionService:
         if MACHINE_ID:
             payload['machineId'] = MACHINE_ID
 
+        # Only the hash travels with the payload; the image goes up in the background
+        thumbnail_hash = self._thumbnail_hash(stats)
+        if thumbnail_hash:
+            payload['thumbnailHash'] = thumbnail_hash
+        return payload
+
+    def _thumbnail_hash(self, stats: GCodeStats) -> Optional[str]:
+        ref = best_fit([t for t in stats.thumbnails if t.fmt in ('PNG', 'JPG')], *THUMBNAIL_UPLOAD_SIZE)
+        return self.thumbnails.submit(ref)
+
+    def send_now(self, stats: GCodeStats, filename: str, product_id: Optional[str], name: str, version: str, target: str = 'product') -> Tuple[str, str]:
+        """
+        Queues the payload and delivers it on the calling thread (batch mode).
+        Returns (key, inbox_id). On failure DeliveryError is raised and the entry
+        stays in the outbox: pending for the background sync, or dead if rejected.
+        """
+        # Not handed to the background worker: it would POST the same entry concurrently
+        payload = self._payload(stats, filename, product_id, name, version, target)
+        with metrics.timer("outbox.enqueue"):
+            key = self.outbox.enqueue(payload, hold=SEND_NOW_HOLD)
+        entry = self.outbox.get(key)
+        if entry is None:
+            raise DeliveryError(f"Outbox entry {key} disappeared before delivery")
         try:
-            req = urllib.request.Request(API_URL)
-            req.add_header('Content-Type', 'application/json; charset=utf-8')
-            jsondata = json.dumps(payload).encode('utf-8')
-            req.add_header('Content-Length', len(jsondata))
-            
-            with urllib.request.urlopen(req, data=jsondata, timeout=10) as response:
-                if response.getcode() == 200:
-                    resp_body = json.loads(response.read())
-                    return resp_body.get('id', '')
-                else:
-                    raise Exception(f"HTTP {response.getcode()}")
-        except urllib.error.HTTPError as e:
-            error_msg = f"HTTP {e.code}"
-            try:
-                body = e.read().decode('utf-8')
-                error_msg += f": {body}"
-            except:
-                pass
-            self.logger.error(f"API Error: {error_msg}")
-            raise Exception(error_msg)
-        except urllib.error.URLError as e:
-            self.logger.error(f"Connection Error: {e.reason}")
-            raise Exception(f"Connection Error: {e.reason}")
-        except Exception as e:
-            self.logger.error(f"Error sending data: {e}")
-            raise Exception(f"Error: {e}")
+            with metrics.timer("outbox.deliver"):
+                inbox_id = self.deliver(dict(entry.payload, idempotencyKey=key))
+        except DeliveryError as e:
+            if e.permanent:
+                self.outbox.mark_dead(entry.id, str(e))
+            else:
+                self.outbox.mark_retry(entry.id, str(e), 0)
+            raise
+        self.outbox.mark_delivered(entry.id)
+        return key, inbox_id
+
+    def deliver(self, payload: dict) -> str:
+        """Posts one outbox payload (single upload or multi-plate chunk). Returns the inbox id."""
+        if 'parentKey' in payload:
+            return self._deliver_batch(payload)
+        # The token is added at send time so it is never persisted in the outbox
+        body = dict(payload, secret_token=SECRET_TOKEN)
+        res = self._post(API_URL, body)
+        if res.status == 200:
+            return res.json().get('id', '')
+        self._raise_for_status(res)
+
+    def _deliver_batch(self, payload: dict) -> str:
+        body = {
+            'secret_token': SECRET_TOKEN,
+            'parentKey': payload['parentKey'],
+            'plates': payload['plates'],
+        }
+        if 'aggregate' in payload:
+            body['aggregate'] = payload['aggregate']
+        res = self._post(API_BATCH_URL, body)
+
+        if res.status == 404:
+            # Server without the batch endpoint: upload the aggregate alone, as before
+            self.logger.info("Batch endpoint not available, sending the aggregate only")
+            if 'aggregate' not in payload:
+                return ''
+            return self.deliver(dict(payload['aggregate'], idempotencyKey=payload['parentKey']))
+        if res.status != 200:
+            self._raise_for_status(res)
+
+        data = res.json()
+        results = data.get('results', [])
+        metrics.count("outbox.batch_plates", len(results))
+        failed = [r for r in results if not r.get('ok')]
+        for r in failed:
+            self.logger.error(f"Plate {r.get('index')} of {payload['parentKey']} not saved: {r.get('error')}")
+        if any(r.get('retryable') for r in failed):
+            # Saved plates come back as duplicates on the retry
+            raise DeliveryError(f"{len(failed)} bandeja(s) sin guardar")
+        return data.get('id', '')
+
+    def _post(self, url: str, body: dict):
+        try:
+            # Safe to retry: the server deduplicates on idempotencyKey / parentKey
+            return self.client.post_json(url, body, timeout=API_TIMEOUT_SEND, idempotent=True)
+        except HttpError as e:
+            self.logger.error(f"Connection Error: {e}")
+            raise DeliveryError(f"Connection Error: {e}")
+
+    def _raise_for_status(self, res):
+        error_msg = f"HTTP {res.status}"
+        if res.body:
+            error_msg += f": {res.text()}"
+        self.logger.error(f"API Error: {error_msg}")
+        # Client errors (bad payload, bad token) will not fix themselves
+        raise DeliveryError(error_msg, permanent=400 <= res.status < 500 and res.status not in (408, 429))
@@ -0,0 +1,268 @@
+import ctypes
+import hashlib
+import json
+import os
+import select
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.logger import Logger
+from utils.files import GCODE_EXTENSIONS, content_fingerprint
+
+MAX_FINGERPRINTS = 5000 # Remembered content hashes of ingested files (oldest dropped first)
+
+
+class _Inotify:
+    """
+    Linux inotify through libc, used only as a wake-up signal: any change in a
+    watched directory triggers a rescan. Not available on other platforms or
+    on many network filesystems, where the watcher simply polls.
+    """
+    MASK = 0x00000008 | 0x00000080 | 0x00000100 | 0x00000200 | 0x00000002 # CLOSE_WRITE, MOVED_TO, CREATE, DELETE, MODIFY
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watched = set()
+
+    def add(self, directory: str):
+        if directory in self._watched:
+            return
+        if self._libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) >= 0:
+            self._watched.add(directory)
+
+    def wait(self, timeout: float) -> bool:
+        """Blocks until something changed or timeout. Returns True on change."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 65536): # Only the wake-up matters, not the events
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """
+    Watches folders (local or network shares) for new or changed G-code files.
+
+    Each scan only stats directory entries. A file is reported once its size
+    and mtime have stayed the same for `settle` seconds and it can be opened,
+    so exports still being written are skipped without blocking. Files whose
+    content fingerprint was already ingested (copies, re-saves) are ignored.
+    What has been seen is persisted, so a restart only reports what changed
+    while the app was closed. On the first run, existing files are taken as
+    already handled unless ingest_existing=True.
+
+    on_files may return the paths it actually ingested; the others are not
+    recorded as handled and are offered again after retry_delay seconds.
+    Returning None means all of them were ingested.
+    """
+    def __init__(self, folders: List[str], on_files: Callable[[List[str]], None], logger: Logger,
+                 state_path: Optional[str] = None, interval: float = 2.0, settle: float = 2.0,
+                 idle_interval: float = 30.0, recursive: bool = False, ingest_existing: bool = False,
+                 retry_delay: float = 60.0):
+        self.folders = [os.path.abspath(f) for f in folders]
+        self.on_files = on_files # Called on the watcher thread with the files ready to ingest
+        self.logger = logger
+        self.state_path = state_path
+        self.interval = interval
+        self.settle = settle
+        self.idle_interval = idle_interval # Safety rescan while inotify is active
+        self.recursive = recursive
+        self.retry_delay = retry_delay
+        self._known: Dict[str, Tuple[int, int]] = {}   # path -> (size, mtime_ns) already handled
+        self._pending: Dict[str, Tuple[Tuple[int, int], float]] = {} # path -> (signature, unchanged since)
+        self._fingerprints: Dict[str, None] = {}  # insertion-ordered set
+        self._stop = threading.Event()
+        self._thread = None
+        self._inotify = None
+        self._listing_failed = False
+        self._baseline = not self._load_state() and not ingest_existing
+
+    @staticmethod
+    def state_path_for(config_dir: str, folders: List[str]) -> str:
+        """One state file per set of watched folders."""
+        digest = hashlib.sha1("|".join(sorted(os.path.abspath(f) for f in folders)).encode('utf-8')).hexdigest()
+        return os.path.join(config_dir, f"watch_state_{digest[:12]}.json")
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        """Watch loop (blocking). start() runs it on a daemon thread."""
+        if sys.platform.startswith('linux'):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                self.logger.debug(f"inotify unavailable, polling: {e}")
+        self.logger.info(f"Watching {self.folders} ({'inotify' if self._inotify else 'polling'})")
+
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.scan()
+                except Exception as e:
+                    self.logger.error(f"Folder watcher error: {e}")
+                self._wait()
+        finally:
+            if self._inotify:
+                self._inotify.close()
+                self._inotify = None
+
+    def _wait(self):
+        # Files settling need a quick re-check; otherwise sleep until something happens
+        if self._pending:
+            timeout = max(0.1, min(self.interval, self.settle / 2))
+        else:
+            timeout = self.idle_interval if self._inotify else self.interval
+        if self._inotify:
+            # Short slices so stop() is honoured promptly
+            deadline = time.monotonic() + timeout
+            while not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._inotify.wait(min(remaining, 1.0)):
+                    return
+        else:
+            self._stop.wait(timeout)
+
+    def scan(self) -> List[str]:
+        """One pass over the folders. Reports the files that became ready and returns those ingested."""
+        now = time.monotonic()
+        self._listing_failed = False
+        seen = set()
+        ready = []
+        batch_fingerprints = set()
+        for path, st in self._iter_files():
+            seen.add(path)
+            sig = (st.st_size, st.st_mtime_ns)
+            if self._known.get(path) == sig:
+                continue
+            if self._baseline:
+                self._known[path] = sig
+                continue
+
+            pending = self._pending.get(path)
+            if pending is None or pending[0] != sig:
+                self._pending[path] = (sig, now) # New or still growing
+                continue
+            if sig[0] == 0 or now - pending[1] < self.settle or not self._can_open(path):
+                continue
+
+            fingerprint = content_fingerprint(path)
+            if fingerprint is None:
+                continue # Unreadable right now: still pending
+            del self._pending[path]
+            if fingerprint in self._fingerprints or fingerprint in batch_fingerprints:
+                self._known[path] = sig
+                self.logger.debug(f"Watcher: same content already ingested, skipping {path}")
+                continue
+            batch_fingerprints.add(fingerprint)
+            ready.append((path, sig, fingerprint))
+
+        # Forget deleted files (not while a folder is unreachable: its files were not listed)
+        if not self._listing_failed:
+            for path in [p for p in self._known if p not in seen]:
+                del self._known[path]
+        for path in [p for p in self._pending if p not in seen]:
+            del self._pending[path]
+
+        if self._baseline and not self._listing_failed:
+            self._baseline = False
+            self._save_state()
+        if not ready:
+            return []
+        paths = [path for path, _, _ in ready]
+        self.logger.info(f"Watcher: {len(paths)} new file(s): {paths}")
+        try:
+            ingested = self.on_files(paths)
+        except Exception as e:
+            self.logger.error(f"Watcher ingest failed: {e}")
+            ingested = []
+        ingested = set(paths if ingested is None else ingested)
+
+        # Only what was ingested is recorded; the rest is offered again later
+        retry_at = time.monotonic() + self.retry_delay
+        for path, sig, fingerprint in ready:
+            if path in ingested:
+                self._known[path] = sig
+                self._fingerprints[fingerprint] = None
+            else:
+                self._pending[path] = (sig, retry_at)
+        if len(ingested) < len(paths):
+            self.logger.info(f"Watcher: {len(paths) - len(ingested)} file(s) not ingested, retrying in {self.retry_delay:.0f}s")
+        while len(self._fingerprints) > MAX_FINGERPRINTS:
+            del self._fingerprints[next(iter(self._fingerprints))]
+        self._save_state()
+        return [path for path in paths if path in ingested]
+
+    def _iter_files(self):
+        stack = list(self.folders)
+        while stack:
+            directory = stack.pop()
+            if self._inotify:
+                self._inotify.add(directory)
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir():
+                                if self.recursive:
+                                    stack.append(entry.path)
+                            elif entry.name.lower().endswith(GCODE_EXTENSIONS):
+                                yield entry.path, entry.stat()
+                        except OSError:
+                            continue
+            except OSError as e:
+                # Unmounted share or missing folder: try again on the next scan
+                self.logger.debug(f"Watcher cannot list {directory}: {e}")
+                self._listing_failed = True
+
+    @staticmethod
+    def _can_open(path: str) -> bool:
+        # On Windows a file still held open for writing by the slicer cannot be opened
+        try:
+            with open(path, 'rb'):
+                return True
+        except OSError:
+            return False
+
+    def _load_state(self) -> bool:
+        if not self.state_path:
+            return False
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            self.logger.error(f"Watcher state unreadable, starting fresh: {e}")
+            return False
+        self._known = {path: tuple(sig) for path, sig in data.get('known', {}).items()}
+        self._fingerprints = dict.fromkeys(data.get('fingerprints', []))
+        return True
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        tmp_path = self.state_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'known': self._known, 'fingerprints': list(self._fingerprints)}, f)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            self.logger.error(f"Watcher state write failed: {e}")
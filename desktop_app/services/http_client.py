@@ -0,0 +1,165 @@
+import gzip
+import http.client
+import json
+import ssl
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from utils.logger import Logger
+from utils.metrics import metrics
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+RETRY_STATUSES = (502, 503, 504)
+GZIP_MIN_BYTES = 1024 # Smaller bodies are not worth compressing
+
+# Errors meaning a pooled keep-alive connection was closed by the server while idle
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+
+class HttpError(Exception):
+    """Raised for connection failures (after retries); HTTP statuses are returned, not raised."""
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def json(self):
+        return json.loads(self.body)
+
+    def text(self) -> str:
+        return self.body.decode('utf-8', errors='replace')
+
+
+class HttpClient:
+    """
+    Small HTTP/1.1 client on top of http.client with a pool of keep-alive
+    connections per host, gzip request/response bodies and bounded exponential
+    backoff retries for idempotent requests. Safe to share between threads.
+    """
+    def __init__(self, logger: Logger, timeout: float = 10, max_retries: int = 3,
+                 backoff: float = 0.5, max_backoff: float = 8.0, pool_size: int = 4):
+        self.logger = logger
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self._pool: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None) -> HttpResponse:
+        return self.request('GET', url, headers=headers, timeout=timeout)
+
+    def post_json(self, url: str, payload, headers: Optional[Dict[str, str]] = None,
+                  timeout: Optional[float] = None, idempotent: bool = False) -> HttpResponse:
+        body = json.dumps(payload).encode('utf-8')
+        all_headers = {'Content-Type': 'application/json; charset=utf-8'}
+        all_headers.update(headers or {})
+        return self.request('POST', url, body=body, headers=all_headers, timeout=timeout,
+                            idempotent=idempotent, compress=True)
+
+    def request(self, method: str, url: str, body: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None,
+                timeout: Optional[float] = None, idempotent: Optional[bool] = None, compress: bool = False) -> HttpResponse:
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        path = parts.path or '/'
+        if parts.query:
+            path += f"?{parts.query}"
+
+        all_headers = {'Accept-Encoding': 'gzip', 'Connection': 'keep-alive'}
+        all_headers.update(headers or {})
+        if body is not None and compress and len(body) >= GZIP_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=6)
+            all_headers['Content-Encoding'] = 'gzip'
+        if body is not None:
+            all_headers['Content-Length'] = str(len(body))
+
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        attempts = 1 + (self.max_retries if idempotent else 0)
+
+        attempt = 0
+        while True:
+            conn, reused = self._acquire(key, timeout)
+            try:
+                if not reused:
+                    with metrics.timer("http.connect"):
+                        conn.connect()
+                with metrics.timer("http.request"):
+                    conn.request(method, path, body=body, headers=all_headers)
+                    res = conn.getresponse()
+                    data = res.read()
+                metrics.count("http.bytes_sent", len(body or b''))
+                metrics.count("http.bytes_received", len(data))
+            except STALE_CONNECTION_ERRORS as e:
+                conn.close()
+                if reused:
+                    # The server dropped an idle connection before reading the request: safe to resend
+                    self.logger.debug(f"Stale connection to {key[1]}, reconnecting: {e}")
+                    metrics.count("http.reconnect")
+                    continue
+                attempt += 1
+                if attempt >= attempts:
+                    raise HttpError(str(e)) from e
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                attempt += 1
+                if attempt >= attempts:
+                    raise HttpError(str(e)) from e
+            else:
+                if res.will_close:
+                    conn.close()
+                else:
+                    self._release(key, conn)
+
+                if res.getheader('Content-Encoding', '').lower() == 'gzip':
+                    data = gzip.decompress(data)
+                response = HttpResponse(res.status, data, {k.lower(): v for k, v in res.getheaders()})
+
+                attempt += 1
+                if res.status not in RETRY_STATUSES or attempt >= attempts:
+                    return response
+
+            metrics.count("http.retry")
+            delay = min(self.max_backoff, self.backoff * (2 ** (attempt - 1)))
+            self.logger.debug(f"{method} {key[1]}{parts.path} failed (attempt {attempt}/{attempts}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def close(self):
+        with self._lock:
+            pools = list(self._pool.values())
+            self._pool = {}
+        for conns in pools:
+            for conn in conns:
+                conn.close()
+
+    def _acquire(self, key, timeout: Optional[float]) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._pool.get(key)
+            conn = idle.pop() if idle else None
+        if conn is not None:
+            conn.timeout = timeout or self.timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(conn.timeout)
+            return conn, True
+
+        scheme, host, port = key
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(host, port, timeout=timeout or self.timeout, context=self._ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout or self.timeout)
+        return conn, False
+
+    def _release(self, key, conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._pool.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(conn)
+                return
+        conn.close()
@@ -0,0 +1,224 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+from utils.logger import Logger
+from utils.metrics import metrics
+
+
+class DeliveryError(Exception):
+    """Raised by the send function. permanent=True means retrying can never succeed (e.g. HTTP 400)."""
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+@dataclass
+class OutboxEntry:
+    id: int
+    key: str # Idempotency key sent with the payload
+    payload: dict
+    attempts: int
+    last_error: Optional[str] = None
+
+
+class Outbox:
+    """
+    Durable queue of pending uploads, stored in a SQLite file so nothing is lost
+    across restarts. Each entry carries an idempotency key that the server uses
+    to ignore re-deliveries of the same payload.
+    """
+    def __init__(self, db_path: str, logger: Logger):
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            )""")
+        # Thumbnails referenced by queued payloads, kept until the server has them
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS thumbnail_uploads (
+                hash TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                content_type TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )""")
+
+    @classmethod
+    def in_dir(cls, config_dir: str, logger: Logger) -> 'Outbox':
+        return cls(os.path.join(config_dir, 'outbox.sqlite3'), logger)
+
+    def enqueue(self, payload: dict, key: Optional[str] = None, hold: float = 0) -> str:
+        """
+        hold: seconds during which due() skips the entry, so a caller delivering
+        it directly owns it meanwhile (if the caller dies it becomes due afterwards).
+        """
+        key = key or str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO outbox (key, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(payload), now + hold, now))
+        return key
+
+    def get(self, key: str) -> Optional[OutboxEntry]:
+        with self._lock:
+            r = self._conn.execute(
+                "SELECT id, key, payload, attempts, last_error FROM outbox WHERE key = ?", (key,)).fetchone()
+        return OutboxEntry(r[0], r[1], json.loads(r[2]), r[3], r[4]) if r else None
+
+    def due(self, limit: int) -> List[OutboxEntry]:
+        """Oldest pending entries whose backoff has elapsed."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, key, payload, attempts, last_error FROM outbox "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (time.time(), limit)).fetchall()
+        return [OutboxEntry(r[0], r[1], json.loads(r[2]), r[3], r[4]) for r in rows]
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the next pending entry becomes due, or None if the queue is empty."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'").fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def mark_delivered(self, entry_id: int):
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (entry_id,))
+
+    def mark_retry(self, entry_id: int, error: str, delay: float):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, last_error = ?, next_attempt_at = ? WHERE id = ?",
+                (error, time.time() + delay, entry_id))
+
+    def mark_dead(self, entry_id: int, error: str):
+        """Keeps the payload for inspection but stops retrying it."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'dead', attempts = attempts + 1, last_error = ? WHERE id = ?",
+                (error, entry_id))
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def add_thumbnail(self, digest: str, data: bytes, content_type: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO thumbnail_uploads (hash, data, content_type, created_at) VALUES (?, ?, ?, ?)",
+                (digest, sqlite3.Binary(data), content_type, time.time()))
+
+    def pending_thumbnails(self) -> List[Tuple[str, bytes, str]]:
+        """(hash, data, content type) of the thumbnails not uploaded yet, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT hash, data, content_type FROM thumbnail_uploads ORDER BY created_at").fetchall()
+        return [(r[0], bytes(r[1]), r[2]) for r in rows]
+
+    def remove_thumbnail(self, digest: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM thumbnail_uploads WHERE hash = ?", (digest,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class OutboxWorker:
+    """
+    Background thread that drains the outbox in batches. On a connection failure
+    the batch stops and the entry is retried with exponential backoff; permanent
+    failures are parked as 'dead' so they never block the queue.
+    """
+    def __init__(self, outbox: Outbox, send: Callable[[dict], str], logger: Logger,
+                 batch_size: int = 10, backoff: float = 2.0, max_backoff: float = 300.0,
+                 on_delivered: Optional[Callable[[OutboxEntry, str], None]] = None,
+                 on_failed: Optional[Callable[[OutboxEntry, str], None]] = None):
+        self.outbox = outbox
+        self.send = send
+        self.logger = logger
+        self.batch_size = batch_size
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.on_delivered = on_delivered
+        self.on_failed = on_failed
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+
+    def _run(self):
+        while self._running:
+            self._wake.clear()
+            try:
+                self._drain()
+            except Exception as e:
+                self.logger.error(f"Outbox worker error: {e}")
+
+            wait = self.outbox.next_due_in()
+            self._wake.wait(timeout=60 if wait is None else min(wait, 60))
+
+    def _drain(self):
+        while self._running:
+            batch = self.outbox.due(self.batch_size)
+            if not batch:
+                return
+            for entry in batch:
+                if not self._deliver(entry):
+                    return # Offline: wait for the backoff before trying the rest
+
+    def _deliver(self, entry: OutboxEntry) -> bool:
+        try:
+            with metrics.timer("outbox.deliver"):
+                result = self.send(dict(entry.payload, idempotencyKey=entry.key))
+        except DeliveryError as e:
+            if e.permanent:
+                self.logger.error(f"Outbox entry {entry.key} rejected: {e}")
+                self.outbox.mark_dead(entry.id, str(e))
+                if self.on_failed:
+                    self.on_failed(entry, str(e))
+                return True
+            delay = min(self.max_backoff, self.backoff * (2 ** entry.attempts))
+            self.logger.info(f"Outbox delivery failed ({e}), retrying in {delay:.0f}s")
+            self.outbox.mark_retry(entry.id, str(e), delay)
+            return False
+        except Exception as e:
+            delay = min(self.max_backoff, self.backoff * (2 ** entry.attempts))
+            self.logger.error(f"Outbox delivery error ({e}), retrying in {delay:.0f}s")
+            self.outbox.mark_retry(entry.id, str(e), delay)
+            return False
+
+        self.outbox.mark_delivered(entry.id)
+        if self.on_delivered:
+            self.on_delivered(entry, result)
+        return True
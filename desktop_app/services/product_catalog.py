@@ -0,0 +1,61 @@
+import json
+import os
+import time
+from dataclasses import asdict
+from typing import List, Optional
+from domain.models import Product
+from utils.logger import Logger
+
+
+class ProductCatalog:
+    """
+    Local snapshot of the product list with the ETag it was served with.
+    Lets the window show products instantly and revalidate with a conditional
+    request; while the snapshot is younger than the TTL no request is made.
+    """
+    def __init__(self, config_dir: str, logger: Logger, ttl: float = 600):
+        self.logger = logger
+        self.path = os.path.join(config_dir, 'products_cache.json')
+        self.ttl = ttl
+        self.products: List[Product] = []
+        self.etag: Optional[str] = None
+        self.fetched_at = 0.0
+        self._load()
+
+    def is_fresh(self) -> bool:
+        return bool(self.products) and time.time() - self.fetched_at < self.ttl
+
+    def update(self, products: List[Product], etag: Optional[str]):
+        self.products = products
+        self.etag = etag
+        self.touch()
+
+    def touch(self):
+        """Marks the snapshot as revalidated (e.g. after a 304 Not Modified)."""
+        self.fetched_at = time.time()
+        self._save()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.products = [Product(**p) for p in data.get('products', [])]
+            self.etag = data.get('etag')
+            self.fetched_at = data.get('fetched_at', 0.0)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.error(f"Product cache read failed: {e}")
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'etag': self.etag,
+                    'fetched_at': self.fetched_at,
+                    'products': [asdict(p) for p in self.products]
+                }, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self.logger.error(f"Product cache write failed: {e}")
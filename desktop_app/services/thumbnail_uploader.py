@@ -0,0 +1,187 @@
+import hashlib
+import os
+import queue
+import threading
+from typing import Optional, Set
+from domain.models import ThumbnailRef
+from core.thumbnails import read_thumbnail
+from services.http_client import HttpClient, HttpError
+from services.outbox import Outbox
+from utils.logger import Logger
+from utils.metrics import metrics
+
+CONTENT_TYPES = {'PNG': 'image/png', 'JPG': 'image/jpeg'} # Formats a browser can show
+
+
+class ThumbnailUploader:
+    """
+    Uploads plate thumbnails as binary, keyed by the SHA-256 of the image, on
+    a background thread. Hashes already on the server are recorded locally
+    (one per line, append-only), so re-slicing the same model never uploads
+    its thumbnail again. The inbox entry only carries the hash, and the web
+    shows no preview until the image arrives. With an outbox, queued images
+    are also stored in its database until uploaded, so an image whose hash is
+    already in a durable payload survives a restart (start() resumes them).
+    """
+    def __init__(self, client: HttpClient, logger: Logger, config_dir: str, url: str, token: str,
+                 outbox: Optional[Outbox] = None, timeout: float = 15, max_attempts: int = 5, backoff: float = 2.0):
+        self.client = client
+        self.logger = logger
+        self.url = url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.outbox = outbox
+        self.record_path = os.path.join(config_dir, 'uploaded_thumbnails.txt')
+        self._uploaded: Set[str] = self._load_record()
+        self._queued: Set[str] = set()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._resume_pending()
+
+    def start(self):
+        """Starts uploading right away (e.g. images left over from a previous run)."""
+        self._ensure_started()
+
+    def submit(self, ref: Optional[ThumbnailRef]) -> Optional[str]:
+        """
+        Hashes the thumbnail and queues its upload unless the server already
+        has it. Returns the hash to reference in the payload (None if unusable).
+        """
+        if ref is None or ref.fmt not in CONTENT_TYPES:
+            return None
+        try:
+            data = read_thumbnail(ref)
+        except Exception as e:
+            self.logger.error(f"Thumbnail read failed: {e}")
+            return None
+        digest = hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            if digest in self._uploaded or digest in self._queued:
+                metrics.count("thumbnail.upload_skipped")
+                return digest
+            self._queued.add(digest)
+        if self.outbox:
+            try:
+                self.outbox.add_thumbnail(digest, data, CONTENT_TYPES[ref.fmt])
+            except Exception as e:
+                self.logger.error(f"Thumbnail persist failed: {e}")
+        self._queue.put((digest, data, CONTENT_TYPES[ref.fmt]))
+        self._ensure_started()
+        return digest
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._queued)
+
+    def flush(self, timeout: float):
+        """Waits up to timeout seconds for queued uploads (batch mode, before exit)."""
+        done = threading.Event()
+        self._queue.put(done)
+        self._ensure_started()
+        done.wait(timeout)
+
+    def stop(self):
+        self._stop.set()
+        self._queue.put(None)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            item = self._queue.get()
+            if item is None:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            digest, data, content_type = item
+            attempt = 0
+            while not self._stop.is_set():
+                attempt += 1
+                try:
+                    with metrics.timer("thumbnail.upload"):
+                        uploaded = self._upload(digest, data, content_type)
+                except Exception as e:
+                    uploaded = None
+                    self.logger.error(f"Thumbnail upload failed ({e})")
+                if uploaded or attempt >= self.max_attempts:
+                    break
+                if uploaded is False:
+                    break # Rejected: retrying cannot help
+                self._stop.wait(self.backoff * (2 ** (attempt - 1)))
+
+            with self._lock:
+                self._queued.discard(digest)
+                if uploaded:
+                    self._uploaded.add(digest)
+            if uploaded:
+                self._record(digest)
+            if uploaded is not None and self.outbox:
+                # Done (or rejected for good); transient failures stay stored for the next run
+                try:
+                    self.outbox.remove_thumbnail(digest)
+                except Exception as e:
+                    self.logger.error(f"Thumbnail unqueue failed: {e}")
+
+    def _upload(self, digest: str, data: bytes, content_type: str) -> Optional[bool]:
+        """True when the server has the image, False if it was rejected, None to retry."""
+        url = f"{self.url}/{digest}?secret_token={self.token}"
+        try:
+            # Cheap existence check first: another machine may have uploaded it
+            res = self.client.request('HEAD', url, timeout=self.timeout)
+            if res.status == 200:
+                metrics.count("thumbnail.upload_skipped")
+                return True
+            res = self.client.request('PUT', url, body=data, headers={'Content-Type': content_type},
+                                      timeout=self.timeout, idempotent=True)
+        except HttpError as e:
+            self.logger.debug(f"Thumbnail upload connection error: {e}")
+            return None
+        if res.status == 200:
+            metrics.count("thumbnail.upload_bytes", len(data))
+            return True
+        self.logger.error(f"Thumbnail upload HTTP {res.status}: {res.text()[:200]}")
+        return False if 400 <= res.status < 500 and res.status not in (408, 429) else None
+
+    def _resume_pending(self):
+        if not self.outbox:
+            return
+        try:
+            pending = self.outbox.pending_thumbnails()
+        except Exception as e:
+            self.logger.error(f"Pending thumbnails unreadable: {e}")
+            return
+        for digest, data, content_type in pending:
+            if digest in self._uploaded:
+                self.outbox.remove_thumbnail(digest)
+                continue
+            self._queued.add(digest)
+            self._queue.put((digest, data, content_type))
+        if pending:
+            self.logger.info(f"Resuming {len(pending)} pending thumbnail upload(s)")
+
+    def _load_record(self) -> Set[str]:
+        try:
+            with open(self.record_path, 'r', encoding='ascii') as f:
+                return {line.strip() for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+        except Exception as e:
+            self.logger.error(f"Thumbnail record unreadable: {e}")
+            return set()
+
+    def _record(self, digest: str):
+        try:
+            with open(self.record_path, 'a', encoding='ascii') as f:
+                f.write(digest + '\n')
+        except OSError as e:
+            self.logger.error(f"Thumbnail record write failed: {e}")
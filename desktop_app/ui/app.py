@@ -3,99 +3,133 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import messagebox
 import threading
-import base64
-import io
 import os
-import webbrowser
-from PIL import Image
 from domain.models import GCodeStats, Product
 from core.parser import GCodeParser
+from core.parse_pool import ParsePool
+from core.thumbnails import best_fit
+from core.gcode_formats import open_gcode_text
+from core.product_index import ProductIndex
+from ui.thumbnails import ThumbnailCache
+from ui.plate_list import VirtualPlateList
+from ui.product_search import ProductSearch
+from utils.metrics import metrics
+from utils.files import GCODE_EXTENSIONS
 from services.api import ProductionService
 from config import VERSION, WEB_URL
 
 class MainWindow:
-    def __init__(self, root: ctk.CTk, file_path: str, parser: GCodeParser, service: ProductionService):
+    def __init__(self, root: ctk.CTk, file_path: str, parser: GCodeParser, service: ProductionService, parse_pool: ParsePool = None):
         self.root = root
         self.parser = parser
         self.service = service
+        self.parse_pool = parse_pool or ParsePool(parser, parser.logger)
         
         # State
-        self.plates = [] # List of dicts: {'path': str, 'stats': GCodeStats}
+        self.plates = [] # List of dicts: {'path': str, 'stats': GCodeStats, 'seq': int}
         self.stats = GCodeStats() # Aggregated stats (Totals)
         self.products = []
+        self.product_index = ProductIndex([])
         self.selected_product = None
+        self.pending = {} # path -> seq of plates still being parsed in the pool
+        self._plate_seq = 0
+        self._notify_when_idle = False
+        self._auto_name = ""
+        self.thumb_cache = ThumbnailCache()
+        self._shown_thumb = None
+        self._reset_totals()
         
         self._setup_ui()
         
         # Load initial file
         self.add_plate(file_path)
         
-        # Load products
+        # Load products: the local snapshot right away, then revalidate in the background
+        cached = self.service.get_cached_products()
+        self._set_products(cached, ProductIndex(cached))
         threading.Thread(target=self._fetch_products, daemon=True).start()
 
+        # Deliver queued uploads (including those left from previous runs)
+        self._quote_keys = set()
+        self.service.start_background_sync(on_delivered=self._on_outbox_delivered, on_failed=self._on_outbox_failed)
+        self._update_outbox_ui()
+
     def add_plate(self, file_path: str):
-        """Parses and adds a new plate/file to the session."""
+        """Queues a new plate/file for background parsing; it joins the session when done."""
+        # Check if already exists to avoid duplicates (optional, but good for idempotency)
+        if file_path in self.pending or any(p['path'] == file_path for p in self.plates):
+            return
+
+        self._plate_seq += 1
+        seq = self._plate_seq
+        self.pending[file_path] = seq
         try:
-            # Check if already exists to avoid duplicates (optional, but good for idempotency)
-            if any(p['path'] == file_path for p in self.plates):
-                return
+            future = self.parse_pool.submit(file_path)
+        except Exception as e:
+            del self.pending[file_path]
+            messagebox.showerror("Error", f"Error al procesar bandeja:\n{e}")
+            return
 
-            stats = self.parser.parse_file(file_path)
-            self.plates.append({'path': file_path, 'stats': stats})
-            
-            self._recalculate_totals()
-            self._update_stats_ui()
-            
-            # Update name if it's the first one
-            if len(self.plates) == 1:
-                self.name_var.set(os.path.basename(file_path))
-                
+        # Done callbacks run on a pool thread: hand the result to the Tk main loop
+        future.add_done_callback(lambda fut: self.root.after(0, lambda: self._on_plate_parsed(file_path, seq, fut)))
+
+    def _on_plate_parsed(self, file_path: str, seq: int, future):
+        if self.pending.get(file_path) != seq:
+            return # Cleared or reloaded while parsing
+        del self.pending[file_path]
+
+        try:
+            stats = future.result()
         except Exception as e:
             messagebox.showerror("Error", f"Error al procesar bandeja:\n{e}")
+            stats = None
 
-    def _recalculate_totals(self):
-        """Aggregates stats from all plates."""
-        if not self.plates:
-            self.stats = GCodeStats()
-            return
+        if stats is not None:
+            # Keep submission order, whatever order the workers finish in
+            idx = next((i for i, p in enumerate(self.plates) if p['seq'] > seq), len(self.plates))
+            self.plates.insert(idx, {'path': file_path, 'stats': stats, 'seq': seq})
+            self._accumulate_plate(stats)
+            self._update_stats_ui()
 
-        total_grams = 0.0
-        total_time = 0
-        total_meters = 0.0
-        total_layers = 0 # Sum of layers (total work done)
-        multicolor = 0
-        
-        filaments = set()
-        machines = set()
-        printers = set()
-        
-        last_thumb = None
+            # Update name if it's the first one (unless the user already typed one)
+            if idx == 0 and self.name_var.get() in ("", self._auto_name):
+                self._auto_name = os.path.basename(file_path)
+                self.name_var.set(self._auto_name)
+
+        if not self.pending and self._notify_when_idle:
+            self._notify_when_idle = False
+            messagebox.showinfo("Info", "Datos recargados.")
+
+    def _reset_totals(self):
+        self.stats = GCodeStats()
+        self._total_grams = 0.0
+        self._filaments = set()
+        self._machines = set()
+        self._printers = set()
+
+    def _accumulate_plate(self, s: GCodeStats):
+        """Adds one plate to the aggregated stats without revisiting the others."""
+        self._total_grams += s.grams
+        self.stats.time_minutes += s.time_minutes
+        self.stats.filament_length_m += s.filament_length_m
+        self.stats.total_layers += s.total_layers # Sum of layers (total work done)
+        self.stats.multicolor_changes += s.multicolor_changes
+
+        if s.filament_type: self._filaments.add(s.filament_type)
+        if s.machine_type: self._machines.add(s.machine_type)
+        if s.printer_model: self._printers.add(s.printer_model)
+
+        self.stats.grams = math.ceil(self._total_grams)
+        self.stats.filament_type = ", ".join(sorted(self._filaments))
+        self.stats.machine_type = next(iter(self._machines)) if self._machines else "FDM"
+        self.stats.printer_model = next(iter(self._printers)) if self._printers else "Unknown"
+        self.stats.thumbnails = next((p['stats'].thumbnails for p in reversed(self.plates) if p['stats'].thumbnails), [])
 
+    def _recalculate_totals(self):
+        """Aggregates stats from all plates."""
+        self._reset_totals()
         for p in self.plates:
-            s = p['stats']
-            total_grams += s.grams
-            total_time += s.time_minutes
-            total_meters += s.filament_length_m
-            total_layers += s.total_layers
-            multicolor += s.multicolor_changes
-            
-            if s.filament_type: filaments.add(s.filament_type)
-            if s.machine_type: machines.add(s.machine_type)
-            if s.printer_model: printers.add(s.printer_model)
-            
-            if s.thumbnail_b64:
-                last_thumb = s.thumbnail_b64
-
-        # Update aggregated object
-        self.stats.grams = math.ceil(total_grams)
-        self.stats.time_minutes = total_time
-        self.stats.filament_length_m = total_meters
-        self.stats.total_layers = total_layers
-        self.stats.multicolor_changes = multicolor
-        self.stats.filament_type = ", ".join(sorted(filaments))
-        self.stats.machine_type = list(machines)[0] if machines else "FDM"
-        self.stats.printer_model = list(printers)[0] if printers else "Unknown"
-        self.stats.thumbnail_b64 = last_thumb
+            self._accumulate_plate(p['stats'])
 
     def _setup_ui(self):
         self.root.title(f"DDREAMS Linker Enterprise v{VERSION}")
@@ -125,11 +159,19 @@ class MainWindow:
         self.total_frame = ctk.CTkFrame(self.stats_container)
         self.total_frame.pack(fill="x", pady=(0, 10))
         ctk.CTkLabel(self.total_frame, text="RESUMEN TOTAL", font=("Arial", 14, "bold")).pack(pady=5)
+
+        self.total_labels = {}
+        for label in ("Tiempo Total", "Peso Total", "Longitud Total", "Filamento", "Capas Totales"):
+            row = ctk.CTkFrame(self.total_frame, fg_color="transparent")
+            row.pack(fill="x", pady=2, padx=10)
+            ctk.CTkLabel(row, text=label, width=140, anchor="w", font=("Arial", 12, "bold"), text_color=("gray40", "gray70")).pack(side="left")
+            self.total_labels[label] = ctk.CTkLabel(row, text="", anchor="w", font=("Arial", 12))
+            self.total_labels[label].pack(side="left", fill="x", expand=True)
         
-        # Plates List
+        # Plates List (virtualized: only visible rows exist)
         ctk.CTkLabel(self.stats_container, text="Bandejas Individuales:", font=("Arial", 12, "bold")).pack(anchor="w")
-        self.plates_frame = ctk.CTkScrollableFrame(self.stats_container, height=200)
-        self.plates_frame.pack(fill="both", expand=True)
+        self.plate_list = VirtualPlateList(self.stats_container, self.plates, height=200)
+        self.plate_list.pack(fill="both", expand=True)
 
         # Right Column (Controls)
         self.right_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
@@ -143,6 +185,8 @@ class MainWindow:
         ctk.CTkButton(self.toolbar, text="🔍 G-Code", command=self._show_gcode_preview, width=80).pack(side="left", padx=5, pady=5)
         ctk.CTkButton(self.toolbar, text="⚙️ Setup", command=self._show_bambu_setup, width=80, fg_color="#546E7A", hover_color="#455A64").pack(side="left", padx=5, pady=5)
         ctk.CTkButton(self.toolbar, text="🪄 Calibrar", command=self._open_calibration, width=80, fg_color="#D81B60", hover_color="#AD1457").pack(side="left", padx=5, pady=5)
+        ctk.CTkButton(self.toolbar, text="🩺 Diagnóstico", command=self._show_diagnostics, width=80, fg_color="#546E7A", hover_color="#455A64").pack(side="left", padx=5, pady=5)
+        ctk.CTkButton(self.toolbar, text="⏱️ Rendimiento", command=self._show_performance, width=80, fg_color="#546E7A", hover_color="#455A64").pack(side="left", padx=5, pady=5)
 
         # Form
         self.form_frame = ctk.CTkFrame(self.right_frame)
@@ -159,9 +203,8 @@ class MainWindow:
         self.radio_quote.pack(anchor="w", padx=15, pady=2)
         
         ctk.CTkLabel(self.form_frame, text="Seleccionar Producto:", font=("Arial", 14, "bold")).pack(anchor="w", padx=15, pady=(15, 5))
-        self.combo_products = ctk.CTkComboBox(self.form_frame, values=[], command=self._on_product_select, state="readonly")
-        self.combo_products.set("Seleccionar producto...")
-        self.combo_products.pack(fill="x", padx=15, pady=(0, 15))
+        self.product_search = ProductSearch(self.form_frame, on_select=self._on_product_select)
+        self.product_search.pack(fill="x", padx=15, pady=(0, 15))
 
         ctk.CTkLabel(self.form_frame, text="Nombre del Proyecto:", font=("Arial", 14, "bold")).pack(anchor="w", padx=15, pady=5)
         self.name_var = tk.StringVar(value="")
@@ -171,6 +214,10 @@ class MainWindow:
         # Action Buttons
         self.btn_send = ctk.CTkButton(self.form_frame, text="ENVIAR A PRODUCCIÓN", command=self._send, height=50, font=("Arial", 16, "bold"), fg_color="#2E7D32", hover_color="#1B5E20")
         self.btn_send.pack(side="bottom", fill="x", padx=15, pady=(10, 20))
+
+        # Outbox status (uploads waiting for the network)
+        self.outbox_label = ctk.CTkLabel(self.form_frame, text="", font=("Arial", 11), text_color=("gray40", "gray70"))
+        self.outbox_label.pack(side="bottom", anchor="w", padx=15)
         
         # Clear Data Button
         ctk.CTkButton(self.form_frame, text="🗑️ Limpiar Datos", command=self._clear_data, fg_color="#C62828", hover_color="#B71C1C").pack(side="bottom", fill="x", padx=15, pady=(0, 5))
@@ -184,9 +231,11 @@ class MainWindow:
             
         if messagebox.askyesno("Confirmar", "¿Estás seguro de que quieres limpiar todos los datos?"):
             self.plates = []
-            self.stats = GCodeStats()
+            self.pending = {}
+            self.plate_list.set_plates(self.plates)
             self.name_var.set("")
             self.preview_label.configure(image=None, text="No Preview")
+            self._shown_thumb = None
             self._recalculate_totals()
             self._update_stats_ui()
             messagebox.showinfo("Limpieza", "Datos eliminados correctamente.")
@@ -194,29 +243,34 @@ class MainWindow:
 
     def _fetch_products(self):
         try:
-            self.products = self.service.get_products()
-            product_names = [p.name for p in self.products]
-            
-            def update():
-                self.combo_products.configure(values=product_names)
-                self.combo_products.set("Seleccionar producto...")
-
-            # Update combo in main thread
-            self.root.after(0, update)
+            products = self.service.get_products()
+            if products == self.products:
+                return # Unchanged (snapshot still valid)
+            # Index built here, off the UI thread
+            index = ProductIndex(products)
+            self.root.after(0, lambda: self._set_products(products, index))
         except Exception as e:
             print(f"Error fetching products: {e}")
 
+    def _set_products(self, products, index: ProductIndex):
+        self.products = products
+        self.product_index = index
+        self.product_search.set_index(index)
+        if self.selected_product is not None:
+            # Keep the selection by id; drop it if the product no longer exists
+            self.selected_product = index.get(self.selected_product.id)
+            if self.selected_product is None:
+                self.product_search.set_text("")
+                self._update_mode_ui()
+
     def _update_stats_ui(self):
-        # 1. Update Totals
-        for w in self.total_frame.winfo_children(): 
-            if isinstance(w, ctk.CTkFrame): w.destroy() # Keep header label
-            
-        def add_total_row(label, value, parent):
-            row = ctk.CTkFrame(parent, fg_color="transparent")
-            row.pack(fill="x", pady=2, padx=10)
-            ctk.CTkLabel(row, text=label, width=140, anchor="w", font=("Arial", 12, "bold"), text_color=("gray40", "gray70")).pack(side="left")
-            ctk.CTkLabel(row, text=str(value), anchor="w", font=("Arial", 12)).pack(side="left", fill="x", expand=True)
+        with metrics.timer("ui.refresh"):
+            self._update_totals_ui()
+            self.plate_list.refresh()
+            self._update_preview()
 
+    def _update_totals_ui(self):
+        """Updates the total labels in place (they are created once in _setup_ui)."""
         # Time formatting
         d, remainder = divmod(self.stats.time_minutes, 1440)
         h, m = divmod(remainder, 60)
@@ -227,8 +281,6 @@ class MainWindow:
             time_str = f"{int(h)}h {int(m)}m"
         else:
             time_str = f"{int(m)}m"
-        
-        add_total_row("Tiempo Total", time_str, self.total_frame)
 
         # Weight formatting
         if self.stats.grams >= 1000:
@@ -238,74 +290,48 @@ class MainWindow:
         else:
             weight_str = f"{int(self.stats.grams)}g"
 
-        add_total_row("Peso Total", weight_str, self.total_frame)
-        add_total_row("Longitud Total", f"{self.stats.filament_length_m:.2f}m", self.total_frame)
-        add_total_row("Filamento", (self.stats.filament_type or "N/A")[:40], self.total_frame)
-        add_total_row("Capas Totales", self.stats.total_layers, self.total_frame)
-
-        # 2. Update Plates List
-        for w in self.plates_frame.winfo_children(): w.destroy()
-        
-        for idx, p in enumerate(self.plates):
-            s = p['stats']
-            plate_frame = ctk.CTkFrame(self.plates_frame)
-            plate_frame.pack(fill="x", pady=2, padx=5)
-            
-            # Header
-            header = ctk.CTkFrame(plate_frame, fg_color="transparent")
-            header.pack(fill="x", padx=5, pady=2)
-            ctk.CTkLabel(header, text=f"Bandeja #{idx+1}: {os.path.basename(p['path'])}", font=("Arial", 11, "bold")).pack(side="left")
-            
-            # Mini stats
-            details = ctk.CTkFrame(plate_frame, fg_color="transparent")
-            details.pack(fill="x", padx=5, pady=2)
-            
-            pd, prem = divmod(s.time_minutes, 1440)
-            ph, pm = divmod(prem, 60)
-            
-            if pd > 0:
-                p_time = f"{int(pd)}d {int(ph)}h {int(pm)}m"
-            else:
-                p_time = f"{int(ph)}h {int(pm)}m"
-            
-            ctk.CTkLabel(details, text=f"⏳ {p_time}", font=("Arial", 10)).pack(side="left", padx=(0, 10))
-            ctk.CTkLabel(details, text=f"⚖️ {s.grams:.1f}g", font=("Arial", 10)).pack(side="left", padx=(0, 10))
-            ctk.CTkLabel(details, text=f"🧵 {s.filament_type}", font=("Arial", 10)).pack(side="left")
-
-        # 3. Update Image
-        if self.stats.thumbnail_b64:
+        values = {
+            "Tiempo Total": time_str,
+            "Peso Total": weight_str,
+            "Longitud Total": f"{self.stats.filament_length_m:.2f}m",
+            "Filamento": (self.stats.filament_type or "N/A")[:40],
+            "Capas Totales": self.stats.total_layers,
+        }
+        for label, value in values.items():
+            self.total_labels[label].configure(text=str(value))
+
+    def _update_preview(self):
+        # Only when the best-fitting thumbnail changed
+        ref = best_fit(self.stats.thumbnails, 280, 280)
+        if ref is not None and ref != self._shown_thumb:
             try:
-                data = base64.b64decode(self.stats.thumbnail_b64)
-                pil_img = Image.open(io.BytesIO(data))
+                pil_img = self.thumb_cache.get(ref)
                 ctk_img = ctk.CTkImage(light_image=pil_img, dark_image=pil_img, size=(280, 280))
                 self.preview_label.configure(image=ctk_img, text="")
+                self._shown_thumb = ref
             except Exception as e:
                 print(f"Thumbnail error: {e}")
 
-    def _on_product_select(self, choice):
-        # Find product by name
-        for p in self.products:
-            if p.name == choice:
-                self.selected_product = p
-                self.btn_send.configure(text=f"Vincular a: {p.name[:20]}...")
-                # If name is default or empty, set to product name
-                current_name = self.name_var.get()
-                if not current_name or current_name.endswith(".gcode"):
-                    self.name_var.set(p.name)
-                break
+    def _on_product_select(self, p: Product):
+        self.selected_product = p
+        self.btn_send.configure(text=f"Vincular a: {p.name[:20]}...")
+        # If name is default or empty, set to product name
+        current_name = self.name_var.get()
+        if not current_name or current_name.lower().endswith(GCODE_EXTENSIONS):
+            self.name_var.set(p.name)
 
     def _update_mode_ui(self):
         mode = self.mode_var.get()
         if mode == 'quote':
-            self.combo_products.configure(state="disabled")
+            self.product_search.set_enabled(False)
             self.btn_send.configure(text="ENVIAR A COTIZADOR", fg_color="#D81B60", hover_color="#AD1457")
         else:
-            self.combo_products.configure(state="readonly")
+            self.product_search.set_enabled(True)
             prod_name = self.selected_product.name if self.selected_product else "Seleccionar producto..."
             self.btn_send.configure(text=f"Vincular a: {prod_name[:15]}...", fg_color="#2E7D32", hover_color="#1B5E20")
 
     def _send(self):
-        # We send the Aggregated Stats (Sum)
+        # One request for the whole session: the aggregated stats (sum) plus every plate's own stats
         
         # We use the filename of the first plate as the "base filename"
         base_filename = os.path.basename(self.plates[0]['path']) if self.plates else "unknown.gcode"
@@ -313,39 +339,84 @@ class MainWindow:
             base_filename = f"[MULTI-PLATE] {base_filename}"
 
         target_mode = self.mode_var.get()
+        product_id = self.selected_product.id if (self.selected_product and target_mode == 'product') else None
 
         try:
-            inbox_id = self.service.send_data(
-                self.stats, 
-                base_filename,
-                self.selected_product.id if (self.selected_product and target_mode == 'product') else None,
-                self.name_var.get(),
-                VERSION,
-                target=target_mode
-            )
+            # Queued in the durable outbox; the background worker delivers it
+            if len(self.plates) > 1:
+                key = self.service.send_plates(
+                    [(p['stats'], os.path.basename(p['path'])) for p in self.plates],
+                    self.stats,
+                    base_filename,
+                    product_id,
+                    self.name_var.get(),
+                    VERSION,
+                    target=target_mode
+                )
+            else:
+                key = self.service.send_data(
+                    self.stats, 
+                    base_filename,
+                    product_id,
+                    self.name_var.get(),
+                    VERSION,
+                    target=target_mode
+                )
             
             if target_mode == 'quote':
-                # Open browser to Admin Finances/Quoter
-                try:
-                    url = f"{WEB_URL}/admin/finanzas?tab=quoter"
-                    if inbox_id:
-                        url += f"&inboxId={inbox_id}"
-                    webbrowser.open(url)
-                except Exception as e:
-                    print(f"Error opening browser: {e}")
-
-            messagebox.showinfo("Éxito", f"Datos enviados ({target_mode}).")
+                # Browser opens once the server returns the inbox id
+                self._quote_keys.add(key)
+
+            self._update_outbox_ui()
+            messagebox.showinfo("Éxito", f"Datos en cola de envío ({target_mode}).")
             # self.root.destroy() # User requested to keep app open
         except Exception as e:
             messagebox.showerror("Error", f"Fallo al enviar datos:\n{e}")
 
+    def _on_outbox_delivered(self, entry, inbox_id: str):
+        # Called on the outbox worker thread
+        self.root.after(0, lambda: self._after_delivery(entry.key, inbox_id))
+
+    def _after_delivery(self, key: str, inbox_id: str):
+        self._update_outbox_ui()
+        if key in self._quote_keys:
+            self._quote_keys.discard(key)
+            # Open browser to Admin Finances/Quoter
+            try:
+                url = f"{WEB_URL}/admin/finanzas?tab=quoter"
+                if inbox_id:
+                    url += f"&inboxId={inbox_id}"
+                import webbrowser # Deferred: only needed after a quote upload
+                webbrowser.open(url)
+            except Exception as e:
+                print(f"Error opening browser: {e}")
+
+    def _on_outbox_failed(self, entry, error: str):
+        # Called on the outbox worker thread
+        def notify():
+            self._quote_keys.discard(entry.key)
+            self._update_outbox_ui()
+            name = entry.payload.get('name') or entry.payload.get('aggregate', {}).get('name', '')
+            messagebox.showerror("Error", f"El servidor rechazó el envío de '{name}':\n{error}")
+        self.root.after(0, notify)
+
+    def _update_outbox_ui(self):
+        count = self.service.pending_count()
+        self.outbox_label.configure(text=f"📤 Envíos pendientes: {count}" if count else "")
+
     def _reload_data(self):
-        # Reload all plates
-        current_paths = [p['path'] for p in self.plates]
+        # Reload all plates (including any still being parsed)
+        current_paths = [p['path'] for p in self.plates] + list(self.pending)
         self.plates = []
+        self.pending = {}
+        self.plate_list.set_plates(self.plates)
+        self._recalculate_totals()
+        self._update_stats_ui()
+        if not current_paths:
+            return
+        self._notify_when_idle = True
         for path in current_paths:
             self.add_plate(path)
-        messagebox.showinfo("Info", "Datos recargados.")
 
     def _show_gcode_preview(self):
         if not self.plates: return
@@ -362,8 +433,9 @@ class MainWindow:
         textbox.pack(fill="both", expand=True, padx=10, pady=10)
         
         try:
-            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read(15000)
+            # .bgcode shows its metadata, 3MF the first plate's G-code
+            with open(path, 'rb') as raw, open_gcode_text(raw) as (f, _):
+                content = f.read(15000).decode('utf-8', errors='ignore')
                 textbox.insert("0.0", content)
                 if len(content) == 15000:
                     textbox.insert("end", "\n\n... [TRUNCADO] ...")
@@ -372,6 +444,109 @@ class MainWindow:
         
         textbox.configure(state="disabled")
 
+    def _show_diagnostics(self):
+        diagnostics = self.parser.diagnostics
+
+        top = ctk.CTkToplevel(self.root)
+        top.title("Diagnóstico de Lectura")
+        top.geometry("750x550")
+        top.attributes("-topmost", True)
+
+        controls = ctk.CTkFrame(top, fg_color="transparent")
+        controls.pack(fill="x", padx=10, pady=(10, 0))
+
+        textbox = ctk.CTkTextbox(top, font=("Consolas", 11))
+        textbox.pack(fill="both", expand=True, padx=10, pady=10)
+
+        def refresh():
+            textbox.configure(state="normal")
+            textbox.delete("0.0", "end")
+            captures = diagnostics.recent()
+            if not captures:
+                textbox.insert("0.0", "Sin capturas. Activa la captura y recarga las bandejas." if not diagnostics.enabled
+                               else "Sin capturas todavía. Recarga las bandejas para capturar.")
+            for c in reversed(captures):
+                textbox.insert("end", f"{c.summary()}\n")
+                for m in c.matches:
+                    textbox.insert("end", f"    {m['kind']}.{m['key']} @ {m['start']}-{m['end']}: {m['value']}\n")
+                textbox.insert("end", "\n")
+            textbox.configure(state="disabled")
+
+        def toggle():
+            diagnostics.enabled = bool(switch.get())
+            refresh()
+
+        def export():
+            from tkinter import filedialog
+            path = filedialog.asksaveasfilename(parent=top, defaultextension=".json", initialfile="ddreams_diagnostico.json",
+                                                filetypes=[("JSON", "*.json")])
+            if not path: return
+            try:
+                diagnostics.export(path)
+                messagebox.showinfo("Diagnóstico", f"Exportado a:\n{path}", parent=top)
+            except Exception as e:
+                messagebox.showerror("Error", f"No se pudo exportar:\n{e}", parent=top)
+
+        switch = ctk.CTkSwitch(controls, text="Capturar diagnóstico", command=toggle)
+        if diagnostics.enabled:
+            switch.select()
+        switch.pack(side="left")
+        ctk.CTkButton(controls, text="Exportar JSON", command=export, width=110).pack(side="right", padx=(5, 0))
+        ctk.CTkButton(controls, text="Actualizar", command=refresh, width=90).pack(side="right", padx=(5, 0))
+
+        refresh()
+
+    def _show_performance(self):
+        top = ctk.CTkToplevel(self.root)
+        top.title("Rendimiento")
+        top.geometry("800x500")
+        top.attributes("-topmost", True)
+
+        controls = ctk.CTkFrame(top, fg_color="transparent")
+        controls.pack(fill="x", padx=10, pady=(10, 0))
+
+        textbox = ctk.CTkTextbox(top, font=("Consolas", 11))
+        textbox.pack(fill="both", expand=True, padx=10, pady=10)
+
+        def refresh():
+            snap = metrics.snapshot()
+            lines = [f"{'Etapa':<28}{'n':>6}{'media':>10}{'p50':>10}{'p95':>10}{'máx':>10}{'total':>11}"]
+            for name, t in snap['timers'].items():
+                lines.append(f"{name:<28}{t['count']:>6}{t['mean_ms']:>8.1f}ms{t['p50_ms']:>8.1f}ms"
+                             f"{t['p95_ms']:>8.1f}ms{t['max_ms']:>8.1f}ms{t['total_ms']:>9.0f}ms")
+            if snap['counters']:
+                lines.append("")
+                lines += [f"{name:<28}{n:>12}" for name, n in sorted(snap['counters'].items())]
+            textbox.configure(state="normal")
+            textbox.delete("0.0", "end")
+            textbox.insert("0.0", "\n".join(lines))
+            textbox.configure(state="disabled")
+
+        def auto_refresh():
+            if top.winfo_exists():
+                refresh()
+                top.after(1000, auto_refresh)
+
+        def export():
+            from tkinter import filedialog
+            path = filedialog.asksaveasfilename(parent=top, defaultextension=".json", initialfile="ddreams_rendimiento.json",
+                                                filetypes=[("JSON", "*.json")])
+            if not path: return
+            try:
+                metrics.export(path)
+                messagebox.showinfo("Rendimiento", f"Exportado a:\n{path}", parent=top)
+            except Exception as e:
+                messagebox.showerror("Error", f"No se pudo exportar:\n{e}", parent=top)
+
+        def reset():
+            metrics.reset()
+            refresh()
+
+        ctk.CTkButton(controls, text="Exportar JSON", command=export, width=110).pack(side="right", padx=(5, 0))
+        ctk.CTkButton(controls, text="Reiniciar", command=reset, width=90).pack(side="right", padx=(5, 0))
+
+        auto_refresh()
+
     def _show_bambu_setup(self):
         top = ctk.CTkToplevel(self.root)
         top.title("Configuración Bambu Studio")
@@ -423,7 +598,11 @@ class MainWindow:
         scroll = ctk.CTkScrollableFrame(top)
         scroll.pack(fill="both", expand=True, padx=10, pady=10)
 
-        candidates = self.parser.scan_candidates(path)
+        status = ctk.CTkLabel(scroll, text="Buscando candidatos...", text_color="gray")
+        status.pack(pady=(20, 5))
+        progress = ctk.CTkProgressBar(scroll)
+        progress.set(0)
+        progress.pack(fill="x", padx=40)
         vars_map = {}
 
         def create_section(title, key, lines):
@@ -440,11 +619,36 @@ class MainWindow:
             cb.pack(fill="x", padx=5, pady=5)
             vars_map[key] = v
 
-        create_section("Tiempo Estimado", 'time', candidates.get('time', []))
-        create_section("Peso (g)", 'filament_grams', candidates.get('filament_grams', []))
-        create_section("Modelo Impresora", 'printer_model', candidates.get('printer_model', []))
-        create_section("Tipo Filamento", 'filament_type', candidates.get('filament_type', []))
-        create_section("Capas", 'total_layers', candidates.get('total_layers', []))
+        def on_progress(fraction):
+            self.root.after(0, lambda: top.winfo_exists() and progress.set(fraction))
+
+        def show(candidates):
+            if not top.winfo_exists(): return # Closed while scanning
+            status.destroy()
+            progress.destroy()
+            create_section("Tiempo Estimado", 'time', candidates.get('time', []))
+            create_section("Peso (g)", 'filament_grams', candidates.get('filament_grams', []))
+            create_section("Modelo Impresora", 'printer_model', candidates.get('printer_model', []))
+            create_section("Tipo Filamento", 'filament_type', candidates.get('filament_type', []))
+            create_section("Capas", 'total_layers', candidates.get('total_layers', []))
+
+        def show_error(message):
+            if not top.winfo_exists(): return
+            progress.destroy()
+            status.configure(text=f"No se pudo leer el archivo: {message}", text_color="#E53935")
+
+        def scan():
+            try:
+                candidates = self.parser.scan_candidates(path, progress=on_progress)
+            except Exception as e:
+                message = str(e) # e is unbound once the except block ends
+                self.parser.logger.error(f"Calibration scan failed: {message}")
+                self.root.after(0, lambda: show_error(message))
+                return
+            self.root.after(0, lambda: show(candidates))
+
+        # The scan reads the file: keep the window responsive while it runs
+        threading.Thread(target=scan, daemon=True).start()
 
         def save():
             report = []
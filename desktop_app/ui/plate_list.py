@@ -0,0 +1,128 @@
+import math
+import os
+import customtkinter as ctk
+
+
+class _PlateRow:
+    """One reusable row: its widgets are created once and rebound to different plates while scrolling."""
+    def __init__(self, master, on_wheel):
+        self.frame = ctk.CTkFrame(master)
+
+        header = ctk.CTkFrame(self.frame, fg_color="transparent")
+        header.pack(fill="x", padx=5, pady=2)
+        self.title = ctk.CTkLabel(header, text="", font=("Arial", 11, "bold"))
+        self.title.pack(side="left")
+
+        details = ctk.CTkFrame(self.frame, fg_color="transparent")
+        details.pack(fill="x", padx=5, pady=2)
+        self.time = ctk.CTkLabel(details, text="", font=("Arial", 10))
+        self.time.pack(side="left", padx=(0, 10))
+        self.grams = ctk.CTkLabel(details, text="", font=("Arial", 10))
+        self.grams.pack(side="left", padx=(0, 10))
+        self.filament = ctk.CTkLabel(details, text="", font=("Arial", 10))
+        self.filament.pack(side="left")
+
+        # Labels swallow wheel events, so every widget of the row scrolls the list
+        for widget in (self.frame, header, details, self.title, self.time, self.grams, self.filament):
+            for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+                widget.bind(seq, on_wheel)
+
+        self.bound = None # (index, plate) currently shown
+
+    def bind_plate(self, idx: int, plate: dict):
+        if self.bound is not None and self.bound[0] == idx and self.bound[1] is plate:
+            return
+        self.bound = (idx, plate)
+        s = plate['stats']
+
+        pd, prem = divmod(s.time_minutes, 1440)
+        ph, pm = divmod(prem, 60)
+        if pd > 0:
+            p_time = f"{int(pd)}d {int(ph)}h {int(pm)}m"
+        else:
+            p_time = f"{int(ph)}h {int(pm)}m"
+
+        self.title.configure(text=f"Bandeja #{idx+1}: {os.path.basename(plate['path'])}")
+        self.time.configure(text=f"⏳ {p_time}")
+        self.grams.configure(text=f"⚖️ {s.grams:.1f}g")
+        self.filament.configure(text=f"🧵 {s.filament_type}")
+
+
+class VirtualPlateList(ctk.CTkFrame):
+    """
+    Virtualized list of plates: only the rows that fit in the visible area exist.
+    Adding a plate rebinds at most the visible rows, so the cost per add stays
+    constant no matter how many plates are in the session.
+    """
+    ROW_HEIGHT = 60 # px, including padding
+
+    def __init__(self, master, plates: list, **kwargs):
+        super().__init__(master, **kwargs)
+        self.plates = plates # Shared with MainWindow; read-only here
+        self.first = 0
+        self.rows = []
+
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.pack(side="left", fill="both", expand=True)
+        self.body.pack_propagate(False) # Rows must not grow the viewport (and create more rows)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.body.bind("<Configure>", self._on_resize)
+        for widget in (self, self.body):
+            self._bind_wheel(widget)
+
+    def set_plates(self, plates: list):
+        self.plates = plates
+        self.first = 0
+        self.refresh()
+
+    def refresh(self):
+        """Rebinds the visible rows to the current data and updates the scrollbar."""
+        visible = len(self.rows)
+        max_first = max(0, len(self.plates) - visible)
+        self.first = min(self.first, max_first)
+
+        for i, row in enumerate(self.rows):
+            idx = self.first + i
+            if idx < len(self.plates):
+                row.bind_plate(idx, self.plates[idx])
+                if not row.frame.winfo_manager():
+                    row.frame.pack(fill="x", pady=2, padx=5)
+            else:
+                row.bound = None
+                row.frame.pack_forget()
+
+        total = max(1, len(self.plates))
+        self.scrollbar.set(self.first / total, min(1.0, (self.first + visible) / total))
+
+    def _on_resize(self, event):
+        needed = max(1, math.ceil(event.height / self.ROW_HEIGHT))
+        while len(self.rows) < needed:
+            self.rows.append(_PlateRow(self.body, self._on_wheel))
+        while len(self.rows) > needed:
+            self.rows.pop().frame.destroy()
+        self.refresh()
+
+    def _scroll_to(self, first: int):
+        first = max(0, min(first, len(self.plates) - len(self.rows)))
+        if first != self.first:
+            self.first = first
+            self.refresh()
+
+    def _on_scrollbar(self, *args):
+        if args[0] == 'moveto':
+            self._scroll_to(round(float(args[1]) * len(self.plates)))
+        elif args[0] == 'scroll':
+            self._scroll_to(self.first + int(args[1]))
+
+    def _on_wheel(self, event):
+        if getattr(event, 'num', None) == 4 or event.delta > 0:
+            self._scroll_to(self.first - 1)
+        else:
+            self._scroll_to(self.first + 1)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", self._on_wheel) # Linux
+        widget.bind("<Button-5>", self._on_wheel)
@@ -0,0 +1,104 @@
+import tkinter as tk
+import customtkinter as ctk
+from core.product_index import ProductIndex
+
+PLACEHOLDER = "Buscar producto..."
+
+
+class ProductSearch(ctk.CTkFrame):
+    """
+    Type-ahead product picker: an entry plus a short list with the top matches.
+    Only `max_results` rows ever exist, so the size of the catalog does not
+    affect how fast it opens or filters. Calls on_select(product) on a choice.
+    """
+    def __init__(self, master, on_select, max_results: int = 8, debounce_ms: int = 80, **kwargs):
+        kwargs.setdefault("fg_color", "transparent")
+        super().__init__(master, **kwargs)
+        self.on_select = on_select
+        self.max_results = max_results
+        self.debounce_ms = debounce_ms
+        self.index = ProductIndex([])
+        self.matches = [] # Indices into index.products shown in the list
+        self._pending = None
+        self._enabled = True
+
+        self.query_var = tk.StringVar()
+        self.entry = ctk.CTkEntry(self, textvariable=self.query_var, placeholder_text=PLACEHOLDER)
+        self.entry.pack(fill="x")
+
+        self.listbox = tk.Listbox(self, height=max_results, activestyle="none", exportselection=False,
+                                  borderwidth=0, highlightthickness=1, font=("Arial", 11))
+
+        self.entry.bind("<KeyRelease>", self._on_key)
+        self.entry.bind("<FocusIn>", lambda e: self._schedule())
+        self.entry.bind("<Down>", lambda e: self._move(1))
+        self.entry.bind("<Up>", lambda e: self._move(-1))
+        self.entry.bind("<Return>", lambda e: self._choose())
+        self.entry.bind("<Escape>", lambda e: self._hide())
+        self.listbox.bind("<ButtonRelease-1>", lambda e: self._choose())
+
+    def set_index(self, index: ProductIndex):
+        self.index = index
+        if self.listbox.winfo_manager():
+            self._refresh()
+
+    def set_text(self, text: str):
+        self.query_var.set(text)
+        self._hide()
+
+    def set_enabled(self, enabled: bool):
+        self._enabled = enabled
+        self.entry.configure(state="normal" if enabled else "disabled")
+        if not enabled:
+            self._hide()
+
+    def _on_key(self, event):
+        if event.keysym in ("Up", "Down", "Return", "Escape"):
+            return
+        self._schedule()
+
+    def _schedule(self):
+        # Debounced: fast typing triggers one search, not one per key
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+        self._pending = self.after(self.debounce_ms, self._refresh)
+
+    def _refresh(self):
+        self._pending = None
+        if not self._enabled:
+            return
+        self.matches = self.index.search(self.query_var.get(), self.max_results)
+        self.listbox.delete(0, "end")
+        for i in self.matches:
+            self.listbox.insert("end", self.index.labels[i])
+        if self.matches:
+            self.listbox.configure(height=len(self.matches))
+            self.listbox.selection_clear(0, "end")
+            self.listbox.selection_set(0)
+            if not self.listbox.winfo_manager():
+                self.listbox.pack(fill="x", pady=(2, 0))
+        else:
+            self._hide()
+
+    def _move(self, step: int):
+        if not self.listbox.winfo_manager():
+            self._refresh()
+            return
+        current = self.listbox.curselection()
+        pos = (current[0] if current else -1) + step
+        pos = max(0, min(pos, len(self.matches) - 1))
+        self.listbox.selection_clear(0, "end")
+        self.listbox.selection_set(pos)
+        self.listbox.see(pos)
+
+    def _choose(self):
+        current = self.listbox.curselection()
+        if not current or current[0] >= len(self.matches):
+            return
+        product = self.index.products[self.matches[current[0]]]
+        self.set_text(self.index.labels[self.matches[current[0]]])
+        self.on_select(product)
+
+    def _hide(self):
+        if self.listbox.winfo_manager():
+            self.listbox.pack_forget()
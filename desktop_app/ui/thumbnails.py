@@ -0,0 +1,33 @@
+import io
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+from domain.models import ThumbnailRef
+from core.thumbnails import read_thumbnail
+from utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+class ThumbnailCache:
+    """Decodes thumbnails lazily from their byte range, once, and keeps the PIL images (LRU)."""
+    def __init__(self, max_items: int = 32):
+        self.max_items = max_items
+        self._images = OrderedDict()
+
+    def get(self, ref: ThumbnailRef) -> Optional['Image.Image']:
+        key = (ref.path, ref.member, ref.offset, ref.length)
+        img = self._images.get(key)
+        if img is not None:
+            self._images.move_to_end(key)
+            return img
+
+        from PIL import Image # Deferred: PIL is only needed once a preview is shown
+        data = read_thumbnail(ref)
+        with metrics.timer("thumbnail.decode"):
+            img = Image.open(io.BytesIO(data))
+            img.load() # Decode now, while the buffer is alive
+        self._images[key] = img
+        if len(self._images) > self.max_items:
+            self._images.popitem(last=False)
+        return img
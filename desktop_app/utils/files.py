@@ -0,0 +1,109 @@
+import hashlib
+import os
+import shutil
+import sys
+import time
+from typing import Optional
+from utils.logger import Logger
+
+FICLONE = 0x40049409 # Linux ioctl: share extents (Btrfs, XFS)
+GCODE_EXTENSIONS = ('.gcode', '.bgcode', '.gcode.3mf')
+FINGERPRINT_SAMPLE_BYTES = 64 * 1024 # Hashed from both the head and the tail
+
+
+def wait_until_stable(path: str, timeout: float = 10.0, interval: float = 0.05, settle: float = 0.2) -> bool:
+    """
+    Polls size and mtime until the file exists, is not empty and has not
+    changed for `settle` seconds (the slicer finished writing it).
+    Returns False if that did not happen within `timeout`.
+    """
+    deadline = time.monotonic() + timeout
+    last = None
+    stable_since = None
+    while True:
+        try:
+            st = os.stat(path)
+            current = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            current = None
+
+        now = time.monotonic()
+        if current is not None and current[0] > 0 and current == last:
+            if stable_since is None:
+                stable_since = now
+            if now - stable_since >= settle:
+                return True
+        else:
+            stable_since = None
+        last = current
+
+        if now >= deadline:
+            return False
+        time.sleep(interval)
+
+
+def _reflink(src: str, dest: str) -> bool:
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        import fcntl
+        with open(src, 'rb') as fs, open(dest, 'wb') as fd:
+            fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+        return True
+    except (OSError, ImportError):
+        try: os.remove(dest)
+        except OSError: pass
+        return False
+
+
+def snapshot_file(src: str, dest: str, logger: Logger, timeout: float = 5.0) -> Optional[str]:
+    """
+    Makes `dest` an independent name for the current contents of `src`, so it
+    survives the slicer deleting or renaming its temp file. Tries the cheap
+    options first: a hardlink (same volume), a reflink (copy-on-write
+    filesystems) and only then a byte copy, retried while the file is locked.
+    Returns the method used, or None if every attempt failed.
+    """
+    try:
+        os.link(src, dest)
+        return 'link'
+    except OSError as e:
+        logger.debug(f"Hardlink not possible ({e}), trying reflink/copy")
+
+    # The copies keep src's mtime: the parse cache is keyed on (size, mtime)
+    if _reflink(src, dest):
+        try: shutil.copystat(src, dest)
+        except OSError: pass
+        return 'reflink'
+
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while True:
+        try:
+            shutil.copy2(src, dest)
+            return 'copy'
+        except OSError as e:
+            if time.monotonic() >= deadline:
+                logger.error(f"Snapshot copy failed: {e}")
+                return None
+            logger.debug(f"Copy failed (file locked?), retrying: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+
+def content_fingerprint(path: str) -> Optional[str]:
+    """
+    Cheap identity of a file's content: size plus hashes of its head and tail.
+    Independent of name and mtime, so copies and re-saves of the same export match.
+    """
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            h = hashlib.sha1(str(size).encode('ascii'))
+            h.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+            if size > FINGERPRINT_SAMPLE_BYTES:
+                f.seek(max(FINGERPRINT_SAMPLE_BYTES, size - FINGERPRINT_SAMPLE_BYTES))
+                h.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+        return h.hexdigest()
+    except OSError:
+        return None
@@ -1,26 +1,144 @@
+import atexit
+import multiprocessing
 import os
-from datetime import datetime
+import queue
+import threading
+import time
+from config import LOG_LEVEL
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "ERROR": 40}
+
+
+class _LogSink:
+    """
+    Background writer shared by every Logger in the process. Records are queued
+    by the caller and written in batches (one open per file per batch) by a
+    daemon thread; files are rotated by size or age, keeping a few backups.
+    Only the main process rotates: pool workers append to the same files, and
+    rotating on their own clocks would push fresh files over the backups.
+    """
+    def __init__(self, batch_size: int = 512, max_bytes: int = 5 * 1024 * 1024,
+                 max_age: float = 7 * 86400, backups: int = 3):
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backups = backups
+        self._queue = queue.SimpleQueue()
+        self._started_at = {} # path -> time the current file was started (for age rotation)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def reset_after_fork(self):
+        # A forked child inherits the queue and thread handle, but not the thread
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self, paths, timestamp: float, msg: str):
+        if self._thread is None:
+            self._start()
+        self._queue.put((paths, timestamp, msg))
+
+    def flush(self, timeout: float = 2.0):
+        """Blocks until everything queued so far is on disk (used at exit)."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch, waiters = [], []
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+            for w in waiters:
+                w.set()
+
+    def _write_batch(self, batch):
+        lines = {}
+        for paths, timestamp, msg in batch:
+            line = f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}] {msg}\n"
+            for path in paths:
+                lines.setdefault(path, []).append(line)
+        rotate = multiprocessing.parent_process() is None
+        for path, chunk in lines.items():
+            if rotate:
+                try:
+                    self._rotate_if_needed(path)
+                except OSError: pass # e.g. file held open by another instance on Windows: rotate later
+            try:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("".join(chunk))
+            except: pass
+
+    def _rotate_if_needed(self, path: str):
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._started_at[path] = time.time()
+            return
+        started = self._started_at.setdefault(path, self._first_timestamp(path, st.st_mtime))
+        if st.st_size < self.max_bytes and time.time() - started < self.max_age:
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{i}"):
+                os.replace(f"{path}.{i}", f"{path}.{i+1}")
+        os.replace(path, f"{path}.1")
+        self._started_at[path] = time.time()
+
+    @staticmethod
+    def _first_timestamp(path: str, default: float) -> float:
+        """Age of an existing file, read from its first line's timestamp."""
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                head = f.read(21)
+            return time.mktime(time.strptime(head[1:20], "%Y-%m-%d %H:%M:%S"))
+        except Exception:
+            return default
+
+
+_sink = _LogSink()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_sink.reset_after_fork)
+
 
 class Logger:
-    def __init__(self):
+    def __init__(self, level: str = LOG_LEVEL):
         self.log_dir = os.path.expanduser("~")
         self.debug_file = os.path.join(self.log_dir, "ddreams_debug.txt")
         self.error_file = os.path.join(self.log_dir, "ddreams_error.log")
+        self.level = LEVELS.get(level.upper(), LEVELS["DEBUG"])
 
     def debug(self, msg: str):
-        self._write(self.debug_file, f"[DEBUG] {msg}")
+        if self.level <= LEVELS["DEBUG"]:
+            _sink.put((self.debug_file,), time.time(), f"[DEBUG] {msg}")
 
     def info(self, msg: str):
-        self._write(self.debug_file, f"[INFO] {msg}")
+        if self.level <= LEVELS["INFO"]:
+            _sink.put((self.debug_file,), time.time(), f"[INFO] {msg}")
 
     def error(self, msg: str):
         print(f"ERROR: {msg}")
-        self._write(self.debug_file, f"[ERROR] {msg}")
-        self._write(self.error_file, f"[ERROR] {msg}")
+        _sink.put((self.debug_file, self.error_file), time.time(), f"[ERROR] {msg}")
 
-    def _write(self, path: str, msg: str):
-        try:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            with open(path, "a", encoding="utf-8") as f:
-                f.write(f"[{timestamp}] {msg}\n")
-        except: pass
+    def flush(self):
+        _sink.flush()
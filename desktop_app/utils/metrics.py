@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict
+
+SAMPLES_KEPT = 256 # Most recent durations per timer, for percentiles
+
+
+class _Timer:
+    __slots__ = ('count', 'total', 'max', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLES_KEPT)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.samples.append(seconds)
+
+
+def _percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class Metrics:
+    """
+    In-memory timers and counters, aggregated per name (e.g. "parse.scan.mmap",
+    "http.request"). Recording is a perf_counter pair and a dict update, cheap
+    enough to leave on in hot paths. Snapshots from other processes (the parse
+    pool) can be merged in with merge().
+    """
+    def __init__(self):
+        self._timers: Dict[str, _Timer] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            t = self._timers.get(name)
+            if t is None:
+                t = self._timers[name] = _Timer()
+            t.add(seconds)
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        """Aggregated view: timers in milliseconds plus raw samples for merging."""
+        with self._lock:
+            timers = {name: (t.count, t.total, t.max, list(t.samples)) for name, t in self._timers.items()}
+            counters = dict(self._counters)
+        out = {'timers': {}, 'counters': counters}
+        for name, (count, total, mx, samples) in sorted(timers.items()):
+            ordered = sorted(samples)
+            out['timers'][name] = {
+                'count': count,
+                'total_ms': total * 1000,
+                'mean_ms': total / count * 1000 if count else 0.0,
+                'p50_ms': _percentile(ordered, 0.50) * 1000,
+                'p95_ms': _percentile(ordered, 0.95) * 1000,
+                'max_ms': mx * 1000,
+                'samples': samples,
+            }
+        return out
+
+    def merge(self, snapshot: dict):
+        with self._lock:
+            for name, data in snapshot.get('timers', {}).items():
+                t = self._timers.get(name)
+                if t is None:
+                    t = self._timers[name] = _Timer()
+                t.count += data['count']
+                t.total += data['total_ms'] / 1000
+                t.max = max(t.max, data['max_ms'] / 1000)
+                t.samples.extend(data['samples'])
+            for name, n in snapshot.get('counters', {}).items():
+                self._counters[name] = self._counters.get(name, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+    def export(self, path: str):
+        snap = self.snapshot()
+        for data in snap['timers'].values():
+            del data['samples']
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(snap, f, indent=2)
+
+
+# Process-wide registry
+metrics = Metrics()
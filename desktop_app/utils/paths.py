@@ -0,0 +1,8 @@
+import os
+
+
+def get_config_dir() -> str:
+    """Per-user directory for patterns, caches and queues (created on demand)."""
+    config_dir = os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), 'ddreams_config')
+    os.makedirs(config_dir, exist_ok=True)
+    return config_dir
@@ -0,0 +1,47 @@
+import os
+import time
+from contextlib import contextmanager
+from utils.logger import Logger
+
+# The launcher passes its start time to the worker so the report covers both processes
+T0_ENV = 'DDREAMS_T0'
+
+
+class StartupTimer:
+    """
+    Time-to-first-window report, in the spirit of `python -X importtime`:
+    named phases (import groups, setup) are timed and logged in one line once
+    the window is mapped, flagged when the total exceeds the budget.
+    """
+    def __init__(self, logger: Logger, budget: float):
+        self.logger = logger
+        self.budget = budget
+        try:
+            self.t0 = float(os.environ[T0_ENV])
+        except (KeyError, ValueError):
+            self.t0 = time.time()
+        self.phases = []
+        self.reported = False
+
+    def child_env(self) -> dict:
+        """Environment for the spawned worker, carrying the launcher start time."""
+        return dict(os.environ, **{T0_ENV: repr(self.t0)})
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def report(self, milestone: str = "first window"):
+        if self.reported:
+            return
+        self.reported = True
+        total = time.time() - self.t0
+        parts = " | ".join(f"{name} {secs*1000:.0f}ms" for name, secs in self.phases)
+        msg = f"Startup: {milestone} after {total*1000:.0f}ms ({parts})"
+        if total > self.budget:
+            msg += f" - OVER BUDGET ({self.budget*1000:.0f}ms)"
+        self.logger.info(msg)
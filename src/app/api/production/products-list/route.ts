@@ -1,3 +1,4 @@
+import { createHash } from 'crypto';
 import { NextRequest, NextResponse } from 'next/server';
 import { db } from '@/lib/firebase';
 import { collection, getDocs, query, orderBy, limit } from 'firebase/firestore';
@@ -31,7 +32,16 @@ export async function GET(req: NextRequest) {
       imageUrl: doc.data().images?.[0]?.url || null
     }));
 
-    return NextResponse.json(products);
+    // 3. Conditional response: the desktop app revalidates its local snapshot
+    const body = JSON.stringify(products);
+    const etag = `"${createHash('sha1').update(body).digest('hex')}"`;
+    if (req.headers.get('if-none-match') === etag) {
+      return new NextResponse(null, { status: 304, headers: { ETag: etag } });
+    }
+
+    return new NextResponse(body, {
+      headers: { 'Content-Type': 'application/json', ETag: etag }
+    });
 
   } catch (error) {
     console.error('[ProductsList] Error:', error);
@@ -0,0 +1,136 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { z } from 'zod';
+import { adminDb } from '@/lib/admin-sdk';
+import { readJsonBody } from '@/lib/request-body';
+import { HookItemSchema, INBOX_COLLECTION, saveInboxItem } from '../inbox';
+
+// Máximo de bandejas por petición; el script trocea sesiones más grandes
+const MAX_PLATES_PER_REQUEST = 100;
+// parentKey -> documento del inbox cuando el agregado se deduplicó contra otro envío
+const ALIAS_COLLECTION = 'slicing_inbox_aliases';
+
+const PlateSchema = HookItemSchema.omit({ linkedProductId: true, target: true, plateCount: true }).extend({
+  index: z.number().int().min(0),
+  idempotencyKey: z.string().min(1).max(128)
+});
+
+// Las bandejas se validan una a una para devolver un resultado por bandeja
+const BatchSchema = z.object({
+  secret_token: z.string(),
+  parentKey: z.string().min(1).max(128),
+  aggregate: HookItemSchema.optional(), // Solo en el primer trozo
+  plates: z.array(z.unknown()).max(MAX_PLATES_PER_REQUEST)
+});
+
+interface PlateResult {
+  index: number | null;
+  key: string | null;
+  ok: boolean;
+  duplicate?: boolean;
+  retryable?: boolean;
+  error?: string;
+}
+
+/**
+ * Envío multi-bandeja: el agregado va al inbox como siempre (doc = parentKey)
+ * y cada bandeja se guarda en slicing_inbox/{id}/plates/{key}.
+ * Si el agregado coincide con un envío reciente, id es ese documento (alias
+ * guardado para los trozos siguientes); si no, id = parentKey.
+ * Una sola petición para toda la sesión, con resultado por bandeja.
+ */
+export async function POST(req: NextRequest) {
+  const start = Date.now();
+
+  try {
+    const body = await readJsonBody(req);
+    const result = BatchSchema.safeParse(body);
+    if (!result.success) {
+      return NextResponse.json(
+        { error: 'Invalid payload', details: result.error.issues },
+        { status: 400 }
+      );
+    }
+
+    const { secret_token, parentKey, aggregate, plates } = result.data;
+    if (secret_token !== process.env.SLICER_HOOK_SECRET) {
+      return NextResponse.json({ error: 'Unauthorized' }, { status: 401 });
+    }
+    if (!adminDb) {
+      return NextResponse.json({ error: 'Database Error', details: 'Admin SDK not initialized' }, { status: 500 });
+    }
+
+    const inboxRef = adminDb.collection(INBOX_COLLECTION);
+    const aliasRef = adminDb.collection(ALIAS_COLLECTION).doc(parentKey);
+    let inboxId: string | null = null;
+    try {
+      // Un trozo anterior (o un reintento) ya resolvió a qué documento van las bandejas
+      const alias = await aliasRef.get();
+      if (alias.exists) {
+        inboxId = alias.data()?.inboxId || null;
+      } else if (aggregate) {
+        const saved = await saveInboxItem({ ...aggregate, idempotencyKey: parentKey });
+        inboxId = saved.id;
+        if (saved.id !== parentKey) {
+          // Mismo trabajo enviado hace poco con otra key: las bandejas van a ese documento,
+          // y los trozos siguientes (sin agregado) lo encuentran por el alias
+          await aliasRef.set({ inboxId: saved.id, createdAt: new Date().toISOString() });
+        }
+      } else if ((await inboxRef.doc(parentKey).get()).exists) {
+        inboxId = parentKey;
+      }
+    } catch (dbError: any) {
+      console.error('[SlicerHook/batch] Critical DB Error:', dbError);
+      return NextResponse.json({
+        error: 'Database Error',
+        details: dbError?.message || String(dbError)
+      }, { status: 500 });
+    }
+    if (!inboxId) {
+      // El primer trozo (con el agregado) aún no se ha guardado: el script reintenta
+      return NextResponse.json({ error: 'Parent not saved yet', parentKey }, { status: 503 });
+    }
+
+    const platesRef = inboxRef.doc(inboxId).collection('plates');
+    // En un documento ajeno las bandejas pueden existir con otras keys: se comparan por índice
+    let existingIndexes = new Set<number>();
+    if (inboxId !== parentKey) {
+      const existing = await platesRef.select('index').get();
+      existingIndexes = new Set(existing.docs.map(d => d.get('index')));
+    }
+    const createdAt = new Date().toISOString();
+    const results = await Promise.all(plates.map(async (raw): Promise<PlateResult> => {
+      const plate = PlateSchema.safeParse(raw);
+      if (!plate.success) {
+        const r = raw as any;
+        return {
+          index: typeof r?.index === 'number' ? r.index : null,
+          key: typeof r?.idempotencyKey === 'string' ? r.idempotencyKey : null,
+          ok: false,
+          error: plate.error.issues.map(i => `${i.path.join('.')}: ${i.message}`).join('; ')
+        };
+      }
+      const { idempotencyKey, ...data } = plate.data;
+      if (existingIndexes.has(data.index)) {
+        return { index: data.index, key: idempotencyKey, ok: true, duplicate: true };
+      }
+      try {
+        await platesRef.doc(idempotencyKey).create({ ...data, createdAt });
+        return { index: data.index, key: idempotencyKey, ok: true };
+      } catch (createErr: any) {
+        if (createErr?.code === 6) { // 6 = ALREADY_EXISTS: reintento
+          return { index: data.index, key: idempotencyKey, ok: true, duplicate: true };
+        }
+        console.error('[SlicerHook/batch] Plate write failed:', createErr);
+        return { index: data.index, key: idempotencyKey, ok: false, retryable: true, error: createErr?.message || String(createErr) };
+      }
+    }));
+
+    const failed = results.filter(r => !r.ok).length;
+    console.log(`[SlicerHook/batch] processed in ${Date.now() - start}ms | parent: ${parentKey} -> ${inboxId} | plates: ${plates.length} | failed: ${failed}`);
+    return NextResponse.json({ success: failed === 0, id: inboxId, results });
+
+  } catch (error) {
+    console.error('[SlicerHook/batch] Error interno:', error);
+    return NextResponse.json({ error: 'Internal Server Error' }, { status: 500 });
+  }
+}
@@ -0,0 +1,127 @@
+import { z } from 'zod';
+import { adminDb } from '@/lib/admin-sdk';
+
+export const INBOX_COLLECTION = 'slicing_inbox';
+
+// Campos de un envío del script (sin el token)
+export const HookItemSchema = z.object({
+  name: z.string().min(1),
+  fileName: z.string(),
+  grams: z.number().min(0),
+  time: z.number().min(0),
+  machineType: z.enum(['FDM', 'RESIN']).default('FDM'),
+  filamentType: z.string().optional(),
+  qualityProfile: z.string().optional(),
+  fileSize: z.number().optional(), 
+  fileTimestamp: z.number().optional(),
+  scriptVersion: z.string().optional(),
+  printerModel: z.string().optional(),
+  machineId: z.string().optional(),
+  nozzleDiameter: z.string().optional(),
+  totalLayers: z.number().optional(),
+  filamentLengthMeters: z.number().optional(), // New
+  multicolorChanges: z.number().optional(), // New: Multicolor Tool Changes
+  linkedProductId: z.string().optional(), // New: Direct Link
+  target: z.string().optional(), // New: 'product' or 'quote'
+  plateCount: z.number().int().min(1).optional(), // Envíos multi-bandeja: nº de bandejas del total
+  thumbnailHash: z.string().regex(/^[a-f0-9]{64}$/).optional(), // SHA-256 de la miniatura en slicer-thumbnails/
+  idempotencyKey: z.string().min(1).max(128).optional() // Outbox key: retries of the same upload reuse it
+});
+
+export type HookItem = z.infer<typeof HookItemSchema>;
+
+export interface SaveResult {
+  id: string;
+  duplicate?: boolean;
+}
+
+/**
+ * Guarda un envío en el inbox (vinculando el producto si corresponde).
+ * Con idempotencyKey la key es el ID del documento: un reintento no duplica.
+ * Lanza si la base de datos falla.
+ */
+export async function saveInboxItem(item: HookItem): Promise<SaveResult> {
+  if (!adminDb) {
+     throw new Error('Admin SDK not initialized');
+  }
+  const { idempotencyKey, ...data } = item;
+
+  // Generar Fingerprint
+  let fingerprint = '';
+  if (data.fileSize && data.fileTimestamp) {
+     fingerprint = `${data.fileName}|${data.fileSize}|${data.fileTimestamp}|${data.grams}|${data.time}`;
+  } else {
+     fingerprint = `${data.fileName}|${data.grams}|${data.time}|${data.machineType}`;
+  }
+
+  // Check Idempotencia Real (Solo si no viene vinculado explícitamente)
+  if (!data.linkedProductId) {
+     const snapshot = await adminDb.collection(INBOX_COLLECTION)
+        .where('fingerprint', '==', fingerprint)
+        .where('status', '==', 'pending')
+        .get();
+     
+     if (!snapshot.empty) {
+         const existing = snapshot.docs[0].data();
+         const existingDate = existing.createdAt ? new Date(existing.createdAt) : new Date();
+         const diffMinutes = (Date.now() - existingDate.getTime()) / 60000;
+         
+         if (diffMinutes < 30) {
+             console.log(`[SlicerHook] Duplicate ignored: ${data.fileName}`);
+             return { id: snapshot.docs[0].id, duplicate: true };
+         }
+     }
+  }
+
+  // ACTUALIZAR PRODUCTO (Vinculación Automática)
+  if (data.linkedProductId) {
+      try {
+          await adminDb.collection('products').doc(data.linkedProductId).update({
+            productionData: {
+                lastSliced: new Date().toISOString(),
+                grams: data.grams,
+                printTimeMinutes: data.time,
+                machineType: data.machineType,
+                filamentType: data.filamentType,
+                fileName: data.fileName,
+                qualityProfile: data.qualityProfile,
+                printerModel: data.printerModel,
+                machineId: data.machineId,
+                nozzleDiameter: data.nozzleDiameter,
+                totalLayers: data.totalLayers,
+                filamentLengthMeters: data.filamentLengthMeters,
+                multicolorChanges: data.multicolorChanges || 0,
+                thumbnailHash: data.thumbnailHash
+            }
+          });
+      } catch (prodErr) {
+          console.error('[SlicerHook] Error updating product:', prodErr);
+          // Continuamos, no bloqueante
+      }
+  }
+
+  // Crear nuevo item
+  const newItem = {
+    ...data,
+    source: 'slicer-hook',
+    fingerprint,
+    createdAt: new Date().toISOString(),
+    status: data.linkedProductId ? 'linked' : 'pending',
+    linkedAt: data.linkedProductId ? new Date().toISOString() : null,
+    linkedBy: data.linkedProductId ? 'SlicerScript' : null
+  };
+
+  if (idempotencyKey) {
+    try {
+      await adminDb.collection(INBOX_COLLECTION).doc(idempotencyKey).create(newItem);
+    } catch (createErr: any) {
+      if (createErr?.code !== 6) throw createErr; // 6 = ALREADY_EXISTS
+      console.log(`[SlicerHook] Retry ignored: ${idempotencyKey}`);
+      return { id: idempotencyKey, duplicate: true };
+    }
+    return { id: idempotencyKey };
+  }
+
+  const docRef = await adminDb.collection(INBOX_COLLECTION).add(newItem);
+  return { id: docRef.id };
+}
@@ -0,0 +1,73 @@
+import { createHash } from 'crypto';
+import { NextRequest, NextResponse } from 'next/server';
+import { adminStorage } from '@/lib/admin-sdk';
+
+export const dynamic = 'force-dynamic';
+
+// Miniaturas de los G-code, direccionadas por el SHA-256 de su contenido:
+// la misma imagen (re-laminados del mismo modelo) se guarda una sola vez.
+const THUMBNAILS_DIR = 'slicer-thumbnails';
+const MAX_THUMBNAIL_BYTES = 2 * 1024 * 1024;
+const HASH_RE = /^[a-f0-9]{64}$/;
+const ALLOWED_TYPES = ['image/png', 'image/jpeg'];
+
+type Params = { params: Promise<{ hash: string }> };
+
+function authorized(req: NextRequest): boolean {
+  return req.nextUrl.searchParams.get('secret_token') === process.env.SLICER_HOOK_SECRET;
+}
+
+/** 200 si la miniatura ya existe, 404 si hay que subirla. */
+export async function HEAD(req: NextRequest, { params }: Params) {
+  const { hash } = await params;
+  if (!authorized(req)) return new NextResponse(null, { status: 401 });
+  if (!HASH_RE.test(hash)) return new NextResponse(null, { status: 400 });
+  if (!adminStorage) return new NextResponse(null, { status: 500 });
+
+  const [exists] = await adminStorage.bucket().file(`${THUMBNAILS_DIR}/${hash}`).exists();
+  return new NextResponse(null, { status: exists ? 200 : 404 });
+}
+
+/** Sube la imagen en binario (cuerpo = bytes PNG/JPEG). Idempotente. */
+export async function PUT(req: NextRequest, { params }: Params) {
+  const { hash } = await params;
+  if (!authorized(req)) {
+    return NextResponse.json({ error: 'Unauthorized' }, { status: 401 });
+  }
+  if (!HASH_RE.test(hash)) {
+    return NextResponse.json({ error: 'Invalid hash' }, { status: 400 });
+  }
+  const contentType = (req.headers.get('content-type') || '').split(';')[0].trim().toLowerCase();
+  if (!ALLOWED_TYPES.includes(contentType)) {
+    return NextResponse.json({ error: `Unsupported type: ${contentType}` }, { status: 415 });
+  }
+  if (!adminStorage) {
+    return NextResponse.json({ error: 'Storage not initialized' }, { status: 500 });
+  }
+
+  try {
+    const data = Buffer.from(await req.arrayBuffer());
+    if (data.length === 0 || data.length > MAX_THUMBNAIL_BYTES) {
+      return NextResponse.json({ error: 'Invalid size' }, { status: 413 });
+    }
+    // El nombre es el hash: se comprueba para que nadie pueda suplantar otra imagen
+    if (createHash('sha256').update(data).digest('hex') !== hash) {
+      return NextResponse.json({ error: 'Hash mismatch' }, { status: 400 });
+    }
+
+    const file = adminStorage.bucket().file(`${THUMBNAILS_DIR}/${hash}`);
+    const [exists] = await file.exists();
+    if (!exists) {
+      await file.save(data, {
+        contentType,
+        resumable: false,
+        metadata: { cacheControl: 'public, max-age=31536000, immutable' }
+      });
+    }
+    return NextResponse.json({ success: true, hash, existing: exists });
+
+  } catch (error: any) {
+    console.error('[Thumbnails] Upload failed:', error);
+    return NextResponse.json({ error: 'Storage Error', details: error?.message || String(error) }, { status: 500 });
+  }
+}
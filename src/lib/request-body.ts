@@ -0,0 +1,16 @@
+import { gunzipSync } from 'node:zlib';
+import type { NextRequest } from 'next/server';
+
+/**
+ * Reads a JSON request body, transparently inflating it when the client sent
+ * `Content-Encoding: gzip` (the desktop linker compresses larger payloads).
+ */
+export async function readJsonBody(req: NextRequest): Promise<unknown> {
+  const encoding = (req.headers.get('content-encoding') || '').toLowerCase();
+  if (encoding !== 'gzip') {
+    return req.json();
+  }
+
+  const raw = Buffer.from(await req.arrayBuffer());
+  return JSON.parse(gunzipSync(raw).toString('utf-8'));
+}